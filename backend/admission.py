@@ -0,0 +1,195 @@
+import math
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import request, jsonify
+
+# Classes de prioridade: interativo é sempre atendido antes de lote
+PRIORITY_CLASSES = ('interactive', 'batch')
+
+
+class AdmissionRejected(Exception):
+    """Requisição recusada antes de iniciar o trabalho (413, ou 429/503 com Retry-After)."""
+
+    def __init__(self, status, reason, retry_after=None):
+        super().__init__(reason)
+        self.status = status
+        self.reason = reason
+        # Sem retry_after (ex.: 413) repetir a mesma requisição nunca vai ser aceito
+        self.retry_after = None if retry_after is None else max(1, math.ceil(retry_after))
+
+
+class TokenBucket:
+    """Token bucket clássico: `rate` tokens/s, capacidade `burst`."""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def take(self, cost=1):
+        """Consome `cost` tokens; retorna 0 se permitido ou os segundos até haver tokens suficientes."""
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= cost:
+            self.tokens -= cost
+            return 0.0
+        if self.rate <= 0:
+            return float('inf')
+        return (cost - self.tokens) / self.rate
+
+
+class AdmissionController:
+    """
+    Controle de admissão para as rotas de predição.
+
+    1. Rate limit por cliente (token bucket; lotes custam um token por paciente e
+       lotes maiores que `burst` são recusados com 413, pois nunca caberiam no bucket).
+    2. Limite de concorrência com fila de espera limitada por classe de prioridade;
+       ao liberar um slot, a classe interativa é atendida primeiro.
+    3. Shedding por deadline: se a espera estimada (fila x tempo médio de serviço)
+       excede o prazo da requisição (header X-Request-Deadline-Ms ou o máximo da
+       classe), ela é recusada antes de entrar na fila.
+    """
+
+    def __init__(self, rate, burst, max_concurrent, max_queue, max_wait_seconds, max_clients=10000):
+        self.rate = rate
+        self.burst = burst
+        self.max_concurrent = max_concurrent
+        self.max_queue = dict(max_queue)
+        self.max_wait_seconds = dict(max_wait_seconds)
+        self.max_clients = max_clients
+
+        self.condition = threading.Condition()
+        self.buckets = OrderedDict()
+        self.active = 0
+        self.waiting = {priority: 0 for priority in PRIORITY_CLASSES}
+        self.service_time_ewma = 0.05
+        self.counters = {
+            "admitted": {priority: 0 for priority in PRIORITY_CLASSES},
+            "rate_limited": {priority: 0 for priority in PRIORITY_CLASSES},
+            "too_large": {priority: 0 for priority in PRIORITY_CLASSES},
+            "shed_queue_full": {priority: 0 for priority in PRIORITY_CLASSES},
+            "shed_deadline": {priority: 0 for priority in PRIORITY_CLASSES},
+        }
+
+    def _check_rate_limit(self, client_id, priority, cost):
+        if cost > self.burst:
+            self.counters["too_large"][priority] += 1
+            raise AdmissionRejected(
+                413, f"Lote com {cost} pacientes excede o limite de {int(self.burst)} por requisição; divida o lote."
+            )
+        bucket = self.buckets.get(client_id)
+        if bucket is None:
+            bucket = self.buckets[client_id] = TokenBucket(self.rate, self.burst)
+            # Mantém só os clientes mais recentes para limitar a memória
+            if len(self.buckets) > self.max_clients:
+                self.buckets.popitem(last=False)
+        else:
+            self.buckets.move_to_end(client_id)
+        wait = bucket.take(cost)
+        if wait > 0:
+            self.counters["rate_limited"][priority] += 1
+            raise AdmissionRejected(429, "Limite de requisições excedido para este cliente.", min(wait, 3600))
+
+    def _estimated_wait(self, priority):
+        """Espera estimada: requisições à frente (mesma classe ou mais prioritárias) por slot."""
+        ahead = sum(self.waiting[p] for p in PRIORITY_CLASSES[:PRIORITY_CLASSES.index(priority) + 1])
+        if self.active < self.max_concurrent and ahead == 0:
+            return 0.0
+        return (ahead + 1) * self.service_time_ewma / self.max_concurrent
+
+    def _has_priority(self, priority):
+        """True se nenhuma classe mais prioritária está esperando."""
+        return all(self.waiting[p] == 0 for p in PRIORITY_CLASSES[:PRIORITY_CLASSES.index(priority)])
+
+    def acquire(self, client_id, priority='interactive', cost=1, deadline_seconds=None):
+        """Admite a requisição (ou lança AdmissionRejected) e ocupa um slot de concorrência."""
+        budget = self.max_wait_seconds[priority]
+        if deadline_seconds is not None:
+            budget = min(budget, deadline_seconds)
+
+        with self.condition:
+            self._check_rate_limit(client_id, priority, cost)
+
+            estimated_wait = self._estimated_wait(priority)
+            if estimated_wait > 0:
+                if self.waiting[priority] >= self.max_queue[priority]:
+                    self.counters["shed_queue_full"][priority] += 1
+                    raise AdmissionRejected(503, "Fila de predições cheia.", estimated_wait)
+                if estimated_wait > budget:
+                    self.counters["shed_deadline"][priority] += 1
+                    raise AdmissionRejected(503, "Prazo da requisição menor que a espera estimada.", estimated_wait)
+
+            give_up_at = time.monotonic() + budget
+            self.waiting[priority] += 1
+            try:
+                while not (self.active < self.max_concurrent and self._has_priority(priority)):
+                    remaining = give_up_at - time.monotonic()
+                    if remaining <= 0:
+                        self.counters["shed_deadline"][priority] += 1
+                        raise AdmissionRejected(503, "Tempo máximo de espera na fila excedido.", self._estimated_wait(priority))
+                    self.condition.wait(remaining)
+            finally:
+                self.waiting[priority] -= 1
+                # Outra classe pode ter ficado elegível ao sairmos da fila
+                self.condition.notify_all()
+
+            self.active += 1
+            self.counters["admitted"][priority] += 1
+        return time.monotonic()
+
+    def release(self, started_at):
+        """Libera o slot e atualiza a média móvel do tempo de serviço."""
+        with self.condition:
+            self.active -= 1
+            self.service_time_ewma = 0.8 * self.service_time_ewma + 0.2 * (time.monotonic() - started_at)
+            self.condition.notify_all()
+
+    def metrics(self):
+        """Estado atual e contadores do controle de admissão."""
+        with self.condition:
+            return {
+                "active": self.active,
+                "max_concurrent": self.max_concurrent,
+                "waiting": dict(self.waiting),
+                "max_queue": dict(self.max_queue),
+                "service_time_ewma_ms": round(self.service_time_ewma * 1000, 3),
+                "tracked_clients": len(self.buckets),
+                "rate_limit": {"rate_per_second": self.rate, "burst": self.burst},
+                **{name: dict(values) for name, values in self.counters.items()}
+            }
+
+    def guard(self, view):
+        """Decorator que aplica o controle de admissão a uma rota Flask."""
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            data = request.get_json(silent=True)
+            is_batch = isinstance(data, list)
+            # Lotes são sempre 'batch'; o cliente só pode rebaixar a própria prioridade
+            priority = 'batch' if is_batch or request.headers.get('X-Priority') == 'batch' else 'interactive'
+            client_id = request.remote_addr or 'anonymous'
+            deadline_ms = request.headers.get('X-Request-Deadline-Ms', type=float)
+
+            try:
+                started_at = self.acquire(
+                    client_id, priority,
+                    cost=len(data) if is_batch else 1,
+                    deadline_seconds=None if deadline_ms is None else deadline_ms / 1000
+                )
+            except AdmissionRejected as e:
+                response = jsonify({"error": e.reason})
+                response.status_code = e.status
+                if e.retry_after is not None:
+                    response.headers['Retry-After'] = str(e.retry_after)
+                return response
+
+            try:
+                return view(*args, **kwargs)
+            finally:
+                self.release(started_at)
+        return wrapper
@@ -1,35 +1,157 @@
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, request, jsonify, make_response, Response, stream_with_context
 from flask_cors import CORS
+from flask_compress import Compress
 import joblib
 import pandas as pd
 import os
+import hashlib
+import json
+import time
 from flasgger import Swagger # Para documentação da API
-from database import init_db, add_prediction_to_history, get_prediction_history
+from database import (
+    init_db, add_predictions_to_history, get_prediction_history, get_latest_prediction_id,
+    get_history_generation, history_supports_rollups, get_prediction_rollups, start_history_maintenance
+)
+from explainer import TreePathExplainer
+from counterfactual import CounterfactualExplorer
+from shadow import ShadowScorer
+from admission import AdmissionController
+from cohort_stats import CohortStats
 
 # --- Configurações da Aplicação ---
 app = Flask(__name__, static_folder='../frontend', static_url_path='/')
 CORS(app) # Habilita CORS para permitir requisições do frontend
 swagger = Swagger(app) # Inicializa o Swagger
 
+# Compressão das respostas (brotli/gzip) acima de um tamanho mínimo
+app.config['COMPRESS_ALGORITHM'] = ['br', 'gzip']
+app.config['COMPRESS_ALGORITHM_STREAMING'] = ['br', 'deflate'] # arquivos estáticos (send_file)
+app.config['COMPRESS_MIN_SIZE'] = 500
+Compress(app)
+
+# Sincronização incremental do histórico (/history?since_id=N e /history/stream)
+HISTORY_PAGE_SIZE = 500
+HISTORY_STREAM_POLL_SECONDS = 1.0
+HISTORY_STREAM_HEARTBEAT_SECONDS = 15.0
+
+# Controle de admissão de /predict e /what-if: rate limit por cliente, limite de
+# concorrência com fila por prioridade (interactive/batch) e shedding por deadline
+admission_controller = AdmissionController(
+    rate=float(os.environ.get('RATE_LIMIT_PER_SECOND', 10)),
+    burst=float(os.environ.get('RATE_LIMIT_BURST', 20)),
+    max_concurrent=int(os.environ.get('MAX_CONCURRENT_PREDICTIONS', 4)),
+    max_queue={
+        'interactive': int(os.environ.get('MAX_QUEUE_INTERACTIVE', 32)),
+        'batch': int(os.environ.get('MAX_QUEUE_BATCH', 8))
+    },
+    max_wait_seconds={
+        'interactive': float(os.environ.get('MAX_WAIT_INTERACTIVE_SECONDS', 2.0)),
+        'batch': float(os.environ.get('MAX_WAIT_BATCH_SECONDS', 10.0))
+    }
+)
+
+# Cache de assets estáticos: URLs versionadas (?v=<hash>) podem ser cacheadas por 1 ano
+STATIC_CACHE_MAX_AGE = 365 * 24 * 60 * 60
+
 # Caminhos para o modelo e as colunas de features
 MODEL_PATH = os.path.join(os.path.dirname(__file__), 'trained_model', 'best_model_pipeline.joblib')
 FEATURE_COLUMNS_PATH = os.path.join(os.path.dirname(__file__), 'trained_model', 'feature_columns.joblib')
 
+# Modelo candidato avaliado em shadow (opcional): pontuado fora da requisição, sem afetar a resposta
+SHADOW_MODEL_PATH = os.environ.get(
+    'SHADOW_MODEL_PATH', os.path.join(os.path.dirname(__file__), 'trained_model', 'candidate_model_pipeline.joblib')
+)
+SHADOW_WORKERS = int(os.environ.get('SHADOW_WORKERS', 2))
+SHADOW_SAMPLE_RATE = float(os.environ.get('SHADOW_SAMPLE_RATE', 1.0))
+SHADOW_MAX_PENDING = int(os.environ.get('SHADOW_MAX_PENDING', 64))
+
 # Carrega o pipeline e as colunas de features ao iniciar a aplicação
 ml_pipeline = None
 feature_columns = None
+explainer = None
+counterfactual_explorer = None
 
 try:
     ml_pipeline = joblib.load(MODEL_PATH)
     feature_columns = joblib.load(FEATURE_COLUMNS_PATH)
+    # Pré-computa os caminhos de decisão por folha para /predict?explain=1
+    explainer = TreePathExplainer(ml_pipeline)
+    counterfactual_explorer = CounterfactualExplorer(explainer)
     print("Modelo e colunas de features carregados com sucesso!")
     print(f"Colunas esperadas pelo modelo: {feature_columns}")
 except Exception as e:
     print(f"Erro ao carregar o modelo ou as colunas de features: {e}")
     print("Certifique-se de que os arquivos 'best_model_pipeline.joblib' e 'feature_columns.joblib' estão na pasta 'backend/trained_model'.")
 
-# Inicializa o banco de dados
+shadow_scorer = None
+if os.path.exists(SHADOW_MODEL_PATH):
+    try:
+        shadow_scorer = ShadowScorer(
+            joblib.load(SHADOW_MODEL_PATH),
+            max_workers=SHADOW_WORKERS, sample_rate=SHADOW_SAMPLE_RATE, max_pending=SHADOW_MAX_PENDING
+        )
+        print(f"Modelo candidato carregado em modo shadow: {SHADOW_MODEL_PATH}")
+    except Exception as e:
+        print(f"Erro ao carregar o modelo candidato (shadow desativado): {e}")
+
+# Inicializa o banco de dados e o job de retenção/compactação do histórico
 init_db()
+start_history_maintenance()
+
+# Snapshot colunar do histórico para /stats, atualizado incrementalmente pelo último id
+cohort_stats = CohortStats(get_prediction_history, get_latest_prediction_id)
+
+def _hash_static_assets(folder):
+    """Calcula o hash do conteúdo de cada asset do frontend para versionar as URLs."""
+    hashes = {}
+    for filename in os.listdir(folder):
+        path = os.path.join(folder, filename)
+        if os.path.isfile(path):
+            with open(path, 'rb') as f:
+                hashes[filename] = hashlib.sha256(f.read()).hexdigest()[:12]
+    return hashes
+
+def _render_index(folder, hashes):
+    """Lê o index.html e troca as referências a CSS/JS por URLs versionadas pelo hash."""
+    with open(os.path.join(folder, 'index.html'), encoding='utf-8') as f:
+        html = f.read()
+    for filename in ('style.css', 'script.js'):
+        if filename in hashes:
+            html = html.replace(f'"{filename}"', f'"{filename}?v={hashes[filename]}"')
+    return html
+
+STATIC_ASSET_HASHES = _hash_static_assets(app.static_folder)
+INDEX_HTML = _render_index(app.static_folder, STATIC_ASSET_HASHES)
+INDEX_ETAG = hashlib.sha256(INDEX_HTML.encode('utf-8')).hexdigest()[:16]
+
+def _client_has_etag(etag):
+    """
+    Verifica o If-None-Match ignorando o sufixo de codificação (ex.: "history-5:br")
+    que o Flask-Compress acrescenta ao ETag de respostas comprimidas.
+    """
+    if request.if_none_match.star_tag:
+        return True
+    return any(tag.split(':')[0] == etag for tag in request.if_none_match.as_set())
+
+@app.after_request
+def add_static_cache_headers(response):
+    """Assets com hash na URL são imutáveis; os demais sempre revalidam via ETag."""
+    if request.endpoint == 'static':
+        filename = request.view_args.get('filename')
+        version = request.args.get('v')
+        if version and version == STATIC_ASSET_HASHES.get(filename):
+            response.headers['Cache-Control'] = f'public, max-age={STATIC_CACHE_MAX_AGE}, immutable'
+        else:
+            response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+def _build_result(prediction, probability):
+    """Monta o dicionário de resposta de uma predição."""
+    return {
+        "prediction": int(prediction),
+        "probability": float(probability),
+        "message": "Predisposição para Alzheimer: Sim - Risco Considerável" if prediction == 1 else "Predisposição para Alzheimer: Não - Risco Baixo"
+    }
 
 # --- Rotas da API ---
 
@@ -38,14 +160,25 @@ def index():
     """
     Rota principal que serve o arquivo index.html do frontend.
     """
-    return send_from_directory(app.static_folder, 'index.html')
+    # O index referencia CSS/JS versionados, então ele próprio sempre revalida
+    response = make_response('', 304) if _client_has_etag(INDEX_ETAG) else make_response(INDEX_HTML)
+    response.headers['Content-Type'] = 'text/html; charset=utf-8'
+    response.headers['Cache-Control'] = 'no-cache'
+    response.set_etag(INDEX_ETAG)
+    return response
 
 @app.route('/predict', methods=['POST'])
+@admission_controller.guard
 def predict():
     """
     Endpoint para predição de Alzheimer.
     ---
     parameters:
+      - name: explain
+        in: query
+        type: string
+        required: false
+        description: 'Se "1", inclui o caminho de decisão da árvore (feature, threshold ou category, direction) em cada resultado.'
       - name: body
         in: body
         required: true
@@ -94,6 +227,17 @@ def predict():
             prediction: {type: integer, description: '0 para Baixo Risco, 1 para Risco Considerável'}
             probability: {type: number, description: 'Probabilidade da classe 1 (Risco Considerável)'}
             message: {type: string, description: 'Mensagem descritiva do resultado'}
+            explanation:
+              type: array
+              description: 'Caminho de decisão (apenas com explain=1). Um lote (lista de pacientes) retorna uma lista de resultados.'
+              items:
+                type: object
+                properties:
+                  feature: {type: string}
+                  threshold: {type: number, description: 'Limite do split, nas unidades originais (apenas features numéricas)'}
+                  category: {type: string, description: 'Categoria comparada (apenas features categóricas)'}
+                  direction: {type: string, description: '"<=" ou ">" (numéricas), "==" ou "!=" (categóricas)'}
+                  imputed: {type: boolean, description: 'Presente (true) quando a feature não foi enviada: a condição foi avaliada sobre o valor imputado'}
       400:
         description: 'Erro nos dados de entrada.'
       500:
@@ -106,10 +250,18 @@ def predict():
     if not data:
         return jsonify({"error": "Dados JSON não fornecidos."}), 400
 
+    # Aceita um único paciente (objeto) ou um lote de pacientes (lista de objetos)
+    is_batch = isinstance(data, list)
+    records = data if is_batch else [data]
+    if not all(isinstance(record, dict) for record in records):
+        return jsonify({"error": "Cada paciente deve ser um objeto JSON."}), 400
+
+    explain = request.args.get('explain', '').lower() in ('1', 'true', 'yes')
+
     # Cria um DataFrame com os dados de entrada, garantindo a ordem e preenchendo faltantes
     # com NaN para que o pipeline de pré-processamento possa lidar com eles
     # É CRUCIAL QUE 'data' CONTENHA TODAS AS COLUNAS EM 'feature_columns'
-    input_df = pd.DataFrame([data], columns=feature_columns)
+    input_df = pd.DataFrame(records, columns=feature_columns)
 
     # Verifica se todas as colunas esperadas estão presentes
     # Este check é fundamental e foi o motivo do seu erro anterior
@@ -118,30 +270,148 @@ def predict():
         return jsonify({"error": f"Colunas ausentes nos dados de entrada: {', '.join(missing_cols)}"}), 400
 
     try:
-        prediction = ml_pipeline.predict(input_df)[0]
-        probability = ml_pipeline.predict_proba(input_df)[:, 1][0] # Probabilidade da classe 1 (Alzheimer)
+        start = time.perf_counter()
+        if explain:
+            # Uma única passada pela árvore devolve predição, probabilidade e caminho
+            predictions, probabilities, paths = explainer.predict_with_explanation(input_df)
+        else:
+            predictions = ml_pipeline.predict(input_df)
+            probabilities = ml_pipeline.predict_proba(input_df)[:, 1] # Probabilidade da classe 1 (Alzheimer)
+        primary_latency_ms = (time.perf_counter() - start) * 1000
 
-        # Adiciona a predição ao histórico
-        add_prediction_to_history(data, int(prediction), float(probability))
+        if shadow_scorer is not None:
+            # Apenas enfileira: o candidato é pontuado no pool de threads do shadow
+            shadow_scorer.submit(input_df, predictions, probabilities, primary_latency_ms)
 
-        result = {
-            "prediction": int(prediction),
-            "probability": float(probability),
-            "message": "Predisposição para Alzheimer: Sim - Risco Considerável" if prediction == 1 else "Predisposição para Alzheimer: Não - Risco Baixo"
-        }
-        return jsonify(result)
+        # Adiciona as predições ao histórico em uma única escrita
+        add_predictions_to_history([
+            (record, int(predictions[i]), float(probabilities[i])) for i, record in enumerate(records)
+        ])
+
+        results = []
+        for i in range(len(records)):
+            result = _build_result(predictions[i], probabilities[i])
+            if explain:
+                result["explanation"] = paths[i]
+            results.append(result)
+
+        return jsonify(results if is_batch else results[0])
     except Exception as e:
         print(f"Erro na predição: {e}")
         return jsonify({"error": f"Erro ao processar a predição: {e}"}), 500
 
+@app.route('/what-if', methods=['POST'])
+@admission_controller.guard
+def what_if():
+    """
+    Endpoint de análise what-if (contrafactual) para um paciente.
+    ---
+    parameters:
+      - name: body
+        in: body
+        required: true
+        schema:
+          type: object
+          properties:
+            patient: {type: object, description: 'Dados do paciente (mesmo formato de /predict)'}
+            vary:
+              description: 'Lista de features numéricas a variar, ou objeto {feature: [min, max]} com limites opcionais'
+              example: {"MMSE": [0, 30], "ADL": [0, 10]}
+            max_results: {type: integer, description: 'Número máximo de contrafactuais retornados (padrão 5)'}
+    responses:
+      200:
+        description: 'Regiões de saída enumeradas e menores mudanças que invertem a predição.'
+        schema:
+          type: object
+          properties:
+            prediction: {type: integer, description: 'Predição atual do paciente'}
+            regions_explored: {type: integer, description: 'Número de regiões distintas (folhas) alcançáveis'}
+            regions: {type: array, items: {type: object}, description: 'Cada região com bounds, prediction, probability, changes e distance'}
+            counterfactuals: {type: array, items: {type: object}, description: 'Regiões que invertem a predição, ordenadas pela menor mudança'}
+      400:
+        description: 'Erro nos dados de entrada.'
+      500:
+        description: 'Erro interno do servidor.'
+    """
+    if counterfactual_explorer is None or feature_columns is None:
+        return jsonify({"error": "Modelo não carregado. Verifique os logs do servidor."}), 500
+
+    data = request.get_json()
+    if (not isinstance(data, dict) or not isinstance(data.get('patient'), dict)
+            or not isinstance(data.get('vary'), (list, dict)) or not data['vary']):
+        return jsonify({"error": "Informe 'patient' (objeto) e 'vary' (lista ou objeto de features a variar)."}), 400
+
+    input_df = pd.DataFrame([data['patient']], columns=feature_columns)
+
+    try:
+        result = counterfactual_explorer.explore(
+            input_df, data['vary'], max_results=data.get('max_results', 5)
+        )
+        return jsonify(result)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        print(f"Erro na análise what-if: {e}")
+        return jsonify({"error": f"Erro ao processar a análise what-if: {e}"}), 500
+
+@app.route('/metrics/admission', methods=['GET'])
+def admission_metrics():
+    """
+    Métricas do controle de admissão (rate limit, concorrência e shedding).
+    ---
+    responses:
+      200:
+        description: 'Slots ativos, fila por prioridade, tempo médio de serviço e contadores admitted/rate_limited/shed_queue_full/shed_deadline por classe.'
+    """
+    return jsonify(admission_controller.metrics())
+
+@app.route('/shadow', methods=['GET'])
+def shadow_stats():
+    """
+    Comparação entre o modelo candidato (shadow) e o modelo de produção.
+    ---
+    responses:
+      200:
+        description: 'Taxa de concordância, deltas de probabilidade, latências (p50/p95) e amostragem do shadow.'
+        schema:
+          type: object
+          properties:
+            enabled: {type: boolean}
+            submitted: {type: integer}
+            skipped: {type: integer, description: 'Requisições descartadas pela amostragem sob carga'}
+            scored: {type: integer}
+            agreement_rate: {type: number}
+            mean_abs_probability_delta: {type: number}
+            max_abs_probability_delta: {type: number}
+            shadow_latency_ms: {type: object}
+            primary_latency_ms: {type: object}
+            recent: {type: array, items: {type: object}}
+    """
+    if shadow_scorer is None:
+        return jsonify({"enabled": False})
+    return jsonify({"enabled": True, **shadow_scorer.stats()})
+
 @app.route('/history', methods=['GET'])
 def history():
     """
     Endpoint para recuperar o histórico de predições.
     ---
+    parameters:
+      - name: since_id
+        in: query
+        type: integer
+        required: false
+        description: 'Retorna apenas predições com id maior que since_id, em ordem crescente (sincronização incremental)'
+      - name: limit
+        in: query
+        type: integer
+        required: false
+        description: 'Tamanho máximo da página quando since_id é informado (padrão e máximo 500)'
     responses:
+      304:
+        description: 'Histórico inalterado desde o ETag enviado em If-None-Match.'
       200:
-        description: 'Lista de predições anteriores.'
+        description: 'Lista de predições anteriores (com ETag derivado do id mais recente).'
         schema:
           type: array
           items:
@@ -154,11 +424,143 @@ def history():
               probability: {type: number}
     """
     try:
-        history_data = get_prediction_history()
-        return jsonify(history_data)
+        # ETag forte derivado da geração (muda na retenção) e do último id:
+        # se nada mudou, evita ler e serializar a tabela
+        since_id = request.args.get('since_id', type=int)
+        etag = f"history-{get_history_generation()}-{get_latest_prediction_id()}"
+        if _client_has_etag(etag):
+            response = make_response('', 304)
+        elif since_id is not None:
+            limit = min(request.args.get('limit', HISTORY_PAGE_SIZE, type=int), HISTORY_PAGE_SIZE)
+            response = jsonify(get_prediction_history(since_id=since_id, limit=max(limit, 1)))
+        else:
+            response = jsonify(get_prediction_history())
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
     except Exception as e:
         print(f"Erro ao recuperar histórico: {e}")
         return jsonify({"error": f"Erro ao recuperar o histórico de predições: {e}"}), 500
 
+@app.route('/history/rollups', methods=['GET'])
+def history_rollups():
+    """
+    Agregados pré-computados do histórico por hora ou por dia.
+    ---
+    parameters:
+      - name: granularity
+        in: query
+        type: string
+        enum: [hourly, daily]
+        required: false
+        description: 'Granularidade dos buckets (padrão daily)'
+      - name: start
+        in: query
+        type: string
+        required: false
+        description: 'Primeiro bucket (inclusivo), ex.: 2025-07-01'
+      - name: end
+        in: query
+        type: string
+        required: false
+        description: 'Último bucket (inclusivo), ex.: 2025-07-31'
+    responses:
+      200:
+        description: 'Lista de buckets com count, count_by_class, mean_probability e quantiles (p25/p50/p75 de MMSE, ADL, FunctionalAssessment, Age).'
+      400:
+        description: 'Granularidade inválida.'
+      501:
+        description: 'Backend de histórico sem suporte a rollups.'
+    """
+    if not history_supports_rollups():
+        return jsonify({"error": "O backend de histórico configurado não mantém rollups."}), 501
+    try:
+        rollups = get_prediction_rollups(
+            granularity=request.args.get('granularity', 'daily'),
+            start=request.args.get('start'),
+            end=request.args.get('end')
+        )
+        return jsonify(rollups)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        print(f"Erro ao recuperar rollups: {e}")
+        return jsonify({"error": f"Erro ao recuperar os rollups do histórico: {e}"}), 500
+
+@app.route('/stats', methods=['GET'])
+def stats():
+    """
+    Estatísticas de coorte do histórico: contagem, taxa de positivos e quantis de probabilidade por grupo.
+    ---
+    parameters:
+      - name: group_by
+        in: query
+        type: string
+        required: false
+        description: 'Até 3 dimensões separadas por vírgula: age_band, mmse_bucket, EducationLevel, Gender, Ethnicity, FamilyHistoryAlzheimers. Sem group_by, retorna um único grupo com todo o histórico.'
+      - name: start
+        in: query
+        type: string
+        required: false
+        description: 'Considera predições com timestamp >= start (ISO), ex.: 2025-07-01'
+      - name: end
+        in: query
+        type: string
+        required: false
+        description: 'Considera predições com timestamp < end (ISO), ex.: 2025-08-01'
+    responses:
+      200:
+        description: 'group_by, as_of_id (último id considerado), total e groups (rótulos das dimensões, count, positives, positive_rate, mean_probability e probability_quantiles p25/p50/p75/p90).'
+      400:
+        description: 'Dimensão ou intervalo de datas inválido.'
+    """
+    group_by = [name.strip() for name in request.args.get('group_by', '').split(',') if name.strip()]
+    try:
+        result = cohort_stats.query(group_by, start=request.args.get('start'), end=request.args.get('end'))
+        return jsonify(result)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        print(f"Erro ao calcular estatísticas de coorte: {e}")
+        return jsonify({"error": f"Erro ao calcular as estatísticas do histórico: {e}"}), 500
+
+@app.route('/history/stream', methods=['GET'])
+def history_stream():
+    """
+    Stream (server-sent events) com as novas predições.
+    ---
+    parameters:
+      - name: since_id
+        in: query
+        type: integer
+        required: false
+        description: 'Envia predições com id maior que since_id (o header Last-Event-ID tem prioridade na reconexão)'
+    responses:
+      200:
+        description: 'Eventos text/event-stream; cada evento tem id igual ao id da predição e data com o registro em JSON.'
+    """
+    last_id = request.headers.get('Last-Event-ID', type=int)
+    if last_id is None:
+        last_id = request.args.get('since_id', get_latest_prediction_id(), type=int)
+
+    def generate(last_id):
+        last_sent = time.monotonic()
+        yield "retry: 3000\n\n"
+        while True:
+            for record in get_prediction_history(since_id=last_id, limit=HISTORY_PAGE_SIZE):
+                last_id = record["id"]
+                last_sent = time.monotonic()
+                yield f"id: {last_id}\ndata: {json.dumps(record)}\n\n"
+            if time.monotonic() - last_sent >= HISTORY_STREAM_HEARTBEAT_SECONDS:
+                # Comentário SSE mantém a conexão viva através de proxies
+                last_sent = time.monotonic()
+                yield ": heartbeat\n\n"
+            time.sleep(HISTORY_STREAM_POLL_SECONDS)
+
+    response = Response(stream_with_context(generate(last_id)), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
 if __name__ == '__main__':
     app.run(debug=True, host='0.0.0.0', port=5000)
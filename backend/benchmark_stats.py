@@ -0,0 +1,102 @@
+"""
+Benchmark das estatísticas de coorte (/stats).
+Mede a carga inicial do snapshot colunar, a atualização incremental e a latência
+das consultas agrupadas (sem e com cache) para um histórico de 1 milhão de predições.
+"""
+import time
+import numpy as np
+
+from cohort_stats import CohortStats
+
+# Configurações globais
+CONFIG = {
+    'random_seed': 42,
+    'n_records': 1_000_000,
+    'n_new_records': 500,
+    'latency_budget_ms': 100.0,
+    'queries': [
+        [],
+        ['age_band'],
+        ['EducationLevel'],
+        ['mmse_bucket'],
+        ['age_band', 'EducationLevel'],
+        ['age_band', 'mmse_bucket', 'Gender']
+    ]
+}
+
+
+class InMemoryHistory:
+    """Histórico sintético em memória com a mesma interface de leitura do database.py."""
+
+    def __init__(self):
+        self.records = []
+
+    def add(self, n_records, rng):
+        probabilities = rng.uniform(0, 1, n_records)
+        ages = rng.uniform(60, 95, n_records)
+        mmse = rng.uniform(0, 30, n_records)
+        education = rng.integers(0, 4, n_records)
+        gender = rng.integers(0, 2, n_records)
+        first_id = len(self.records) + 1
+        self.records.extend(
+            {
+                "id": first_id + i,
+                "timestamp": "2025-07-01T12:00:00",
+                "input_data": {
+                    "Age": float(ages[i]), "MMSE": float(mmse[i]),
+                    "EducationLevel": int(education[i]), "Gender": int(gender[i])
+                },
+                "prediction": int(probabilities[i] >= 0.5),
+                "probability": float(probabilities[i])
+            }
+            for i in range(n_records)
+        )
+
+    def get_history(self, since_id=None, limit=None):
+        return self.records[since_id:since_id + limit]
+
+    def get_latest_id(self):
+        return len(self.records)
+
+
+def main():
+    """Função principal do script."""
+    print("📊 BENCHMARK DAS ESTATÍSTICAS DE COORTE")
+    print("=" * 60)
+    rng = np.random.default_rng(CONFIG['random_seed'])
+    history = InMemoryHistory()
+    history.add(CONFIG['n_records'], rng)
+    stats = CohortStats(history.get_history, history.get_latest_id)
+
+    start = time.perf_counter()
+    stats.query([])
+    print(f"Carga inicial do snapshot ({CONFIG['n_records']:,} registros): {time.perf_counter() - start:.2f}s")
+
+    history.add(CONFIG['n_new_records'], rng)
+    start = time.perf_counter()
+    stats.query([])
+    print(f"Atualização incremental (+{CONFIG['n_new_records']} registros): "
+          f"{(time.perf_counter() - start) * 1000:.1f} ms")
+
+    print(f"\n{'GROUP BY':<36} {'GRUPOS':>7} {'SEM CACHE (ms)':>15} {'COM CACHE (ms)':>15}")
+    print("-" * 76)
+    slowest = 0.0
+    for group_by in CONFIG['queries']:
+        stats.results.clear()
+        start = time.perf_counter()
+        result = stats.query(group_by)
+        cold_ms = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        stats.query(group_by)
+        cached_ms = (time.perf_counter() - start) * 1000
+        slowest = max(slowest, cold_ms)
+        label = ','.join(group_by) or '(total)'
+        print(f"{label:<36} {len(result['groups']):>7} {cold_ms:>15.2f} {cached_ms:>15.3f}")
+
+    print("=" * 60)
+    status = "✅" if slowest <= CONFIG['latency_budget_ms'] else "❌"
+    print(f"{status} Consulta mais lenta: {slowest:.1f} ms (orçamento: {CONFIG['latency_budget_ms']:.0f} ms)")
+
+
+if __name__ == "__main__":
+    main()
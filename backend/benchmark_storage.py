@@ -0,0 +1,99 @@
+"""
+Benchmark dos backends de armazenamento do histórico.
+Compara throughput de escrita em lote e latência de leitura paginada (since_id)
+entre SQLite (tabela única e particionado por mês) e MongoDB (servidor real via MONGO_URI ou mongomock local).
+"""
+import os
+import time
+import tempfile
+import numpy as np
+
+from database import SQLiteHistoryStorage, MongoHistoryStorage, _build_record
+from partitioned_history import PartitionedSQLiteHistoryStorage
+
+# Configurações globais
+CONFIG = {
+    'random_seed': 42,
+    'n_records': 20000,
+    'batch_size': 500,
+    'page_size': 500,
+    'n_page_reads': 50
+}
+
+
+def create_storages():
+    """Cria uma instância vazia de cada backend disponível."""
+    storages = {
+        'sqlite': SQLiteHistoryStorage(os.path.join(tempfile.mkdtemp(), 'benchmark.db')),
+        'sqlite-part': PartitionedSQLiteHistoryStorage(os.path.join(tempfile.mkdtemp(), 'benchmark.db'))
+    }
+
+    if os.environ.get('MONGO_URI'):
+        storages['mongo'] = MongoHistoryStorage(os.environ['MONGO_URI'], 'alzheimer_benchmark')
+        storages['mongo'].collection.drop()
+        storages['mongo'].counters.drop()
+        storages['mongo'].committed_ranges.drop()
+    else:
+        try:
+            import mongomock
+            storages['mongomock'] = MongoHistoryStorage(client=mongomock.MongoClient())
+        except ImportError:
+            print("⚠️ mongomock não instalado e MONGO_URI não definido: pulando backend MongoDB")
+
+    for storage in storages.values():
+        storage.init()
+    return storages
+
+
+def generate_records(n_records):
+    """Gera registros sintéticos de histórico."""
+    rng = np.random.default_rng(CONFIG['random_seed'])
+    mmse = rng.uniform(0, 30, n_records)
+    probabilities = rng.uniform(0, 1, n_records)
+    return [
+        _build_record({"MMSE": float(mmse[i]), "Age": 70}, int(probabilities[i] >= 0.5), float(probabilities[i]))
+        for i in range(n_records)
+    ]
+
+
+def benchmark_writes(storage, records):
+    """Insere os registros em lotes e retorna o throughput (registros/s)."""
+    batch_size = CONFIG['batch_size']
+    start = time.perf_counter()
+    for i in range(0, len(records), batch_size):
+        storage.add_many(records[i:i + batch_size])
+    return len(records) / (time.perf_counter() - start)
+
+
+def benchmark_paged_reads(storage, n_records):
+    """Mede a latência (ms) de leituras paginadas a partir de since_id aleatórios."""
+    rng = np.random.default_rng(CONFIG['random_seed'])
+    latencies = []
+    for since_id in rng.integers(0, n_records - CONFIG['page_size'], CONFIG['n_page_reads']):
+        start = time.perf_counter()
+        storage.get_history(since_id=int(since_id), limit=CONFIG['page_size'])
+        latencies.append((time.perf_counter() - start) * 1000)
+    return np.percentile(latencies, [50, 95])
+
+
+def main():
+    """Função principal do script."""
+    print("📦 BENCHMARK DOS BACKENDS DE HISTÓRICO")
+    print("=" * 60)
+    print(f"📊 {CONFIG['n_records']} registros | lotes de {CONFIG['batch_size']} | "
+          f"páginas de {CONFIG['page_size']}")
+
+    records = generate_records(CONFIG['n_records'])
+    storages = create_storages()
+
+    print(f"\n{'BACKEND':<12} {'ESCRITA (reg/s)':>16} {'LEITURA p50 (ms)':>18} {'LEITURA p95 (ms)':>18}")
+    print("-" * 68)
+    for name, storage in storages.items():
+        throughput = benchmark_writes(storage, records)
+        p50, p95 = benchmark_paged_reads(storage, CONFIG['n_records'])
+        print(f"{name:<12} {throughput:>16,.0f} {p50:>18.2f} {p95:>18.2f}")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
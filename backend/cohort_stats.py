@@ -0,0 +1,267 @@
+import math
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+# Dimensões de agrupamento: faixas (`edges`, intervalos [a, b)) ou um domínio fixo de
+# códigos (`values`). Valores fora do domínio vão para o grupo 'other' e ausentes para None,
+# então o número de grupos é limitado independentemente do que os clientes enviam
+STATS_DIMENSIONS = {
+    'age_band': {'feature': 'Age', 'edges': (65, 70, 75, 80, 85, 90)},
+    'mmse_bucket': {'feature': 'MMSE', 'edges': (10, 18, 24)},
+    'EducationLevel': {'feature': 'EducationLevel', 'values': (0, 1, 2, 3)},
+    'Gender': {'feature': 'Gender', 'values': (0, 1)},
+    'Ethnicity': {'feature': 'Ethnicity', 'values': (0, 1, 2, 3)},
+    'FamilyHistoryAlzheimers': {'feature': 'FamilyHistoryAlzheimers', 'values': (0, 1)},
+}
+STATS_OTHER_LABEL = 'other'
+STATS_QUANTILES = (0.25, 0.5, 0.75, 0.9)
+
+# Resolução do histograma de probabilidades usado nos quantis (erro máximo de 1/STATS_PROBABILITY_BINS)
+STATS_PROBABILITY_BINS = 1000
+# Máximo de dimensões por consulta (limita grupos x faixas do histograma em memória)
+STATS_MAX_GROUP_BY = 3
+# Linhas lidas do histórico por página ao atualizar o snapshot
+STATS_SYNC_PAGE_SIZE = 5000
+# Formatos de consulta mantidos no cache de resultados
+STATS_CACHE_SIZE = 128
+
+
+def _band_labels(edges):
+    """Rótulos das faixas: '<a', 'a-b' (intervalo [a, b)) e 'z+'."""
+    labels = [f"<{edges[0]}"]
+    labels += [f"{low}-{high}" for low, high in zip(edges, edges[1:])]
+    labels.append(f"{edges[-1]}+")
+    return labels
+
+
+def _category_key(value):
+    """Normaliza o valor de uma feature categórica (1, 1.0 e "1" viram o mesmo grupo)."""
+    if value is None or value == '':
+        return None
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return str(value)
+    if math.isnan(number):
+        return None
+    return int(number) if number.is_integer() else number
+
+
+def _to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return math.nan
+
+
+class _Dimension:
+    """Códigos (int16) por linha de uma dimensão de agrupamento e seus rótulos (domínio fixo)."""
+
+    def __init__(self, name, feature, edges=None, values=None):
+        self.name = name
+        self.feature = feature
+        self.edges = None if edges is None else np.asarray(edges, dtype=float)
+        if edges is not None:
+            # Última posição reservada para valores ausentes
+            self.labels = _band_labels(edges) + [None]
+        else:
+            self.labels = list(values) + [STATS_OTHER_LABEL, None]
+            self.codes_by_value = {value: code for code, value in enumerate(values)}
+            self.other_code = len(values)
+            self.missing_code = len(values) + 1
+
+    def encode(self, input_data):
+        """Códigos de um lote de registros (lista de dicts de entrada)."""
+        if self.edges is not None:
+            values = np.array([_to_float(data.get(self.feature)) for data in input_data], dtype=float)
+            codes = np.digitize(values, self.edges)
+            codes[np.isnan(values)] = len(self.labels) - 1
+            return codes.astype(np.int16)
+
+        codes = np.empty(len(input_data), dtype=np.int16)
+        for i, data in enumerate(input_data):
+            key = _category_key(data.get(self.feature))
+            if key is None:
+                codes[i] = self.missing_code
+            else:
+                codes[i] = self.codes_by_value.get(key, self.other_code)
+        return codes
+
+
+class CohortStats:
+    """
+    Estatísticas de coorte (contagem, taxa de positivos, quantis de probabilidade)
+    sobre um snapshot colunar do histórico em memória.
+
+    O snapshot guarda só o necessário para agregar (timestamp, predição,
+    probabilidade e o código de cada dimensão) em arrays NumPy e é
+    atualizado incrementalmente a partir do último id visto. Cada consulta é
+    uma passada vetorizada (`np.bincount` sobre a chave combinada dos grupos);
+    o resultado fica em cache por formato de consulta até chegar uma predição
+    nova. Linhas removidas pela retenção continuam no snapshot até o processo
+    reiniciar.
+    """
+
+    def __init__(self, fetch_history, fetch_latest_id, dimensions=None):
+        self.fetch_history = fetch_history
+        self.fetch_latest_id = fetch_latest_id
+        self.dimension_specs = dict(STATS_DIMENSIONS if dimensions is None else dimensions)
+        self.lock = threading.Lock()
+        self.results = OrderedDict()
+        self._reset()
+
+    def _reset(self):
+        self.dimensions = {
+            name: _Dimension(name, spec['feature'], spec.get('edges'), spec.get('values'))
+            for name, spec in self.dimension_specs.items()
+        }
+        self.last_id = 0
+        self.size = 0
+        self.columns = {
+            'timestamp': np.empty(0, dtype='datetime64[us]'),
+            'prediction': np.empty(0, dtype=np.int8),
+            'probability': np.empty(0, dtype=np.float64),
+            'probability_bin': np.empty(0, dtype=np.int32),
+            **{name: np.empty(0, dtype=np.int16) for name in self.dimensions}
+        }
+        self.results.clear()
+
+    def _append(self, records):
+        """Acrescenta registros do histórico às colunas (capacidade dobra quando enche)."""
+        n = len(records)
+        if self.size + n > len(self.columns['prediction']):
+            capacity = max(self.size + n, 2 * len(self.columns['prediction']), 1024)
+            for name, column in self.columns.items():
+                grown = np.empty(capacity, dtype=column.dtype)
+                grown[:self.size] = column[:self.size]
+                self.columns[name] = grown
+
+        probabilities = np.array([r['probability'] for r in records], dtype=np.float64)
+        batch = {
+            'timestamp': np.array([r['timestamp'] for r in records], dtype='datetime64[us]'),
+            'prediction': np.array([r['prediction'] for r in records], dtype=np.int8),
+            'probability': probabilities,
+            'probability_bin': np.clip(
+                (probabilities * STATS_PROBABILITY_BINS).astype(np.int32), 0, STATS_PROBABILITY_BINS - 1
+            )
+        }
+        input_data = [r['input_data'] for r in records]
+        for name, dimension in self.dimensions.items():
+            batch[name] = dimension.encode(input_data)
+
+        for name, values in batch.items():
+            self.columns[name][self.size:self.size + n] = values
+        self.size += n
+        self.last_id = records[-1]['id']
+
+    def refresh(self):
+        """Traz para o snapshot as predições com id maior que o último visto."""
+        latest_id = self.fetch_latest_id()
+        if latest_id < self.last_id:
+            # O histórico foi recriado (ex.: outro banco): reconstrói do zero
+            self._reset()
+        while latest_id > self.last_id:
+            page = self.fetch_history(since_id=self.last_id, limit=STATS_SYNC_PAGE_SIZE)
+            if not page:
+                break
+            self._append(page)
+            self.results.clear()
+
+    def _aggregate(self, group_by, start, end):
+        mask = np.ones(self.size, dtype=bool)
+        timestamps = self.columns['timestamp'][:self.size]
+        if start is not None:
+            mask &= timestamps >= start
+        if end is not None:
+            mask &= timestamps < end
+        rows = None if mask.all() else np.flatnonzero(mask)
+
+        def column(name):
+            values = self.columns[name][:self.size]
+            return values if rows is None else values[rows]
+
+        # Chave combinada dos grupos (ordem mista das dimensões pedidas)
+        shape = [len(self.dimensions[name].labels) for name in group_by]
+        n_groups = int(np.prod(shape)) if shape else 1
+        keys = np.zeros(int(mask.sum()), dtype=np.int64)
+        for name, size in zip(group_by, shape):
+            keys = keys * size + column(name)
+
+        counts = np.bincount(keys, minlength=n_groups)
+        positives = np.bincount(keys, weights=column('prediction'), minlength=n_groups)
+        probability_sums = np.bincount(keys, weights=column('probability'), minlength=n_groups)
+
+        # Histograma de probabilidades só dos grupos presentes: a chave é compactada
+        # (posição do grupo entre os presentes) com uma tabela de consulta, sem ordenar
+        present = np.flatnonzero(counts)
+        bins = STATS_PROBABILITY_BINS
+        compact = np.zeros(n_groups, dtype=np.int64)
+        compact[present] = np.arange(len(present))
+        histogram = np.bincount(
+            compact[keys] * bins + column('probability_bin'), minlength=len(present) * bins
+        ).reshape(len(present), bins)
+        cumulative = histogram.cumsum(axis=1)
+
+        quantiles = {}
+        for q in STATS_QUANTILES:
+            # Mesma interpolação dentro da faixa usada nos rollups do histórico
+            target = q * counts[present]
+            position = np.argmax(cumulative >= target[:, None], axis=1)
+            in_bin = histogram[np.arange(len(present)), position]
+            before = cumulative[np.arange(len(present)), position] - in_bin
+            quantiles[f"p{int(q * 100)}"] = (position + (target - before) / in_bin) / bins
+
+        # Os códigos seguem a ordem de exibição (faixas pelos limites, domínio, 'other', ausentes),
+        # então os grupos presentes já saem ordenados pela chave combinada
+        groups = []
+        for i, group in enumerate(present):
+            codes = [int(code) for code in np.unravel_index(group, shape)] if shape else []
+            count = int(counts[group])
+            groups.append({
+                **{name: self.dimensions[name].labels[code] for name, code in zip(group_by, codes)},
+                "count": count,
+                "positives": int(positives[group]),
+                "positive_rate": round(float(positives[group]) / count, 4),
+                "mean_probability": round(float(probability_sums[group]) / count, 4),
+                "probability_quantiles": {name: round(float(values[i]), 4) for name, values in quantiles.items()}
+            })
+        return {
+            "group_by": list(group_by),
+            "as_of_id": self.last_id,
+            "total": int(counts.sum()),
+            "groups": groups
+        }
+
+    def query(self, group_by=(), start=None, end=None):
+        """
+        Estatísticas agrupadas por `group_by` (nomes de STATS_DIMENSIONS), opcionalmente
+        limitadas a predições com `start` <= timestamp < `end` (datas/horas ISO).
+        """
+        group_by = tuple(group_by)
+        unknown = [name for name in group_by if name not in self.dimension_specs]
+        if unknown:
+            raise ValueError(
+                f"Dimensão desconhecida: {', '.join(unknown)} (use {', '.join(self.dimension_specs)})"
+            )
+        if len(set(group_by)) != len(group_by) or len(group_by) > STATS_MAX_GROUP_BY:
+            raise ValueError(f"Use até {STATS_MAX_GROUP_BY} dimensões distintas em group_by.")
+        try:
+            start = None if start is None else np.datetime64(start, 'us')
+            end = None if end is None else np.datetime64(end, 'us')
+        except ValueError:
+            raise ValueError("start/end devem ser datas ISO (ex.: 2025-07-01 ou 2025-07-01T12:00).")
+
+        with self.lock:
+            self.refresh()
+            shape = (group_by, start, end)
+            result = self.results.get(shape)
+            if result is None:
+                result = self.results[shape] = self._aggregate(group_by, start, end)
+                if len(self.results) > STATS_CACHE_SIZE:
+                    self.results.popitem(last=False)
+            else:
+                self.results.move_to_end(shape)
+            return result
+
@@ -0,0 +1,185 @@
+import numpy as np
+
+# Margem (em unidades originais) usada para ficar estritamente dentro de uma região
+COUNTERFACTUAL_MARGIN = 1e-3
+
+
+def _dominates(a, b):
+    """True se as mudanças de `a` são um subconjunto (com deltas não maiores) das de `b`."""
+    deltas_b = {c["feature"]: abs(c["to"] - c["from"]) for c in b["changes"]}
+    if len(a["changes"]) >= len(deltas_b) and a["distance"] >= b["distance"]:
+        return False
+    return all(
+        c["feature"] in deltas_b and abs(c["to"] - c["from"]) <= deltas_b[c["feature"]]
+        for c in a["changes"]
+    )
+
+
+def _is_number(value):
+    return isinstance(value, (int, float, np.number)) and not isinstance(value, (bool, np.bool_))
+
+
+def _parse_vary(vary):
+    """Normaliza `vary` para {feature: (min, max)}, validando nomes e limites (ValueError se inválido)."""
+    if isinstance(vary, dict):
+        items = list(vary.items())
+    elif isinstance(vary, (list, tuple)):
+        items = [(feature, None) for feature in vary]
+    else:
+        raise ValueError("'vary' deve ser uma lista de features ou um objeto {feature: [min, max]}.")
+    if not items:
+        raise ValueError("Informe ao menos uma feature em 'vary'.")
+
+    limits_by_feature = {}
+    for feature, limits in items:
+        if not isinstance(feature, str):
+            raise ValueError(f"Nome de feature inválido em 'vary': {feature!r}")
+        if limits is None:
+            limits = (None, None)
+        if not isinstance(limits, (list, tuple)) or len(limits) != 2:
+            raise ValueError(f"Limites de {feature} devem ser um par [min, max].")
+        if any(bound is not None and not _is_number(bound) for bound in limits):
+            raise ValueError(f"Limites de {feature} devem ser números ou null.")
+        limits_by_feature[feature] = tuple(limits)
+    return limits_by_feature
+
+
+class CounterfactualExplorer:
+    """
+    Análise what-if sobre a árvore de decisão.
+
+    Fixa as features não variadas no valor do paciente e percorre a árvore
+    uma única vez, ramificando apenas nos splits das features variadas. Cada
+    folha alcançável define uma região (caixa de intervalos) com saída
+    constante, então todas as regiões distintas são enumeradas sem pontuar
+    uma grade de valores.
+    """
+
+    def __init__(self, explainer):
+        self.explainer = explainer
+        self.tree = explainer.tree
+        self.classes = explainer.classifier.classes_
+        self.feature_map = explainer.feature_map
+        # Índice da coluna transformada de cada feature numérica original
+        self.numeric_columns = {
+            fm["feature"]: j for j, fm in enumerate(self.feature_map) if fm["kind"] == "numeric"
+        }
+
+    def _to_original(self, column, value):
+        fm = self.feature_map[column]
+        return value * fm["scale"] + fm["offset"]
+
+    def _to_transformed(self, column, value):
+        fm = self.feature_map[column]
+        return (value - fm["offset"]) / fm["scale"]
+
+    def _enumerate_regions(self, transformed_row, boxes):
+        """
+        Percorre a árvore seguindo o paciente nas features fixas e ramificando
+        nas variadas. Retorna (folha, caixa) para cada região alcançável.
+        """
+        tree = self.tree
+        regions = []
+        stack = [(0, boxes)]
+        while stack:
+            node, box = stack.pop()
+            left, right = tree.children_left[node], tree.children_right[node]
+            if left == right:
+                regions.append((node, box))
+                continue
+            column = tree.feature[node]
+            threshold = tree.threshold[node]
+            if column not in box:
+                stack.append((left if transformed_row[column] <= threshold else right, box))
+                continue
+            low, high = box[column]
+            # Esquerda: x <= threshold | Direita: x > threshold
+            if low < threshold:
+                stack.append((left, {**box, column: (low, min(high, threshold))}))
+            if high > threshold:
+                stack.append((right, {**box, column: (max(low, threshold), high)}))
+        return regions
+
+    def explore(self, input_df, vary, max_results=5):
+        """
+        Enumera as regiões de saída ao variar as features em `vary` e retorna as
+        menores mudanças (distância em desvios-padrão) que invertem a predição.
+
+        `vary` é uma lista de features ou um dict {feature: [min, max]} com
+        limites opcionais (None = sem limite) em unidades originais.
+        """
+        vary = _parse_vary(vary)
+        if not _is_number(max_results) or max_results != int(max_results) or max_results < 1:
+            raise ValueError("'max_results' deve ser um inteiro maior ou igual a 1.")
+        max_results = int(max_results)
+
+        unknown = [feature for feature in vary if feature not in self.numeric_columns]
+        if unknown:
+            raise ValueError(f"Features não suportadas para variação: {', '.join(unknown)}")
+
+        boxes = {}
+        for feature, limits in vary.items():
+            low, high = limits
+            column = self.numeric_columns[feature]
+            # Intervalos no espaço transformado: (low, high]
+            boxes[column] = (
+                -np.inf if low is None else self._to_transformed(column, low) - 1e-9,
+                np.inf if high is None else self._to_transformed(column, high)
+            )
+
+        transformed_row = np.asarray(self.explainer.preprocessor.transform(input_df), dtype=float)[0]
+        current_leaf = self.explainer.classifier.apply(transformed_row.reshape(1, -1))[0]
+        current_prediction = self._leaf_prediction(current_leaf)[0]
+
+        regions = []
+        for leaf, box in self._enumerate_regions(transformed_row, boxes):
+            prediction, probability = self._leaf_prediction(leaf)
+            changes, distance = self._nearest_point(transformed_row, box)
+            regions.append({
+                "bounds": {
+                    self.feature_map[column]["feature"]: {
+                        "min_exclusive": None if np.isinf(low) else round(self._to_original(column, low), 4),
+                        "max_inclusive": None if np.isinf(high) else round(self._to_original(column, high), 4)
+                    }
+                    for column, (low, high) in sorted(box.items())
+                },
+                "prediction": int(prediction),
+                "probability": float(probability),
+                "changes": changes,
+                "distance": round(float(distance), 4)
+            })
+
+        flips = sorted(
+            (r for r in regions if r["prediction"] != current_prediction),
+            key=lambda r: r["distance"]
+        )
+        flips = [r for r in flips if not any(_dominates(other, r) for other in flips if other is not r)]
+        return {
+            "prediction": int(current_prediction),
+            "regions_explored": len(regions),
+            "regions": regions,
+            "counterfactuals": flips[:max_results]
+        }
+
+    def _leaf_prediction(self, leaf):
+        values = self.tree.value[leaf, 0, :]
+        probabilities = values / values.sum()
+        return self.classes[np.argmax(probabilities)], probabilities[1]
+
+    def _nearest_point(self, transformed_row, box):
+        """Ponto da caixa mais próximo do paciente e sua distância L1 em desvios-padrão."""
+        changes = []
+        distance = 0.0
+        for column, (low, high) in sorted(box.items()):
+            current = transformed_row[column]
+            feature = self.feature_map[column]["feature"]
+            original = self._to_original(column, current)
+            if low < current <= high:
+                continue
+            if current <= low:
+                target = self._to_original(column, low) + COUNTERFACTUAL_MARGIN
+            else:
+                target = self._to_original(column, high) - COUNTERFACTUAL_MARGIN
+            distance += abs(self._to_transformed(column, target) - current)
+            changes.append({"feature": feature, "from": round(float(original), 4), "to": round(float(target), 4)})
+        return changes, distance
@@ -1,60 +1,342 @@
 import sqlite3
 import os
+from abc import ABC, abstractmethod
 import json
+import threading
 from datetime import datetime
 
 DATABASE_FILE = os.path.join(os.path.dirname(__file__), 'instance', 'site.db')
 
-def init_db():
-    """Inicializa o banco de dados e cria a tabela de histórico de predições."""
-    os.makedirs(os.path.dirname(DATABASE_FILE), exist_ok=True)
-    conn = sqlite3.connect(DATABASE_FILE)
-    cursor = conn.cursor()
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS predictions_history (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            timestamp TEXT NOT NULL,
-            input_data TEXT NOT NULL,
-            prediction INTEGER NOT NULL,
-            probability REAL NOT NULL
+# Backend de armazenamento do histórico: 'sqlite-partitioned' (padrão), 'sqlite' (tabela única) ou 'mongo'
+HISTORY_STORAGE = os.environ.get('HISTORY_STORAGE', 'sqlite-partitioned')
+MONGO_URI = os.environ.get('MONGO_URI', 'mongodb://localhost:27017')
+MONGO_DATABASE = os.environ.get('MONGO_DATABASE', 'alzheimer')
+
+# Intervalo do job de manutenção (retenção + compactação), em segundos; 0 desativa
+HISTORY_MAINTENANCE_INTERVAL = int(os.environ.get('HISTORY_MAINTENANCE_INTERVAL', 6 * 60 * 60))
+
+# Quantidade de documentos trazida do MongoDB por round-trip do cursor
+MONGO_CURSOR_BATCH_SIZE = 500
+
+
+def _build_record(input_data, prediction, probability, timestamp=None):
+    """
+    Monta um registro de histórico. Sem `timestamp`, o backend carimba o horário
+    no momento da gravação (junto da reserva dos ids, para manter a ordem).
+    """
+    return {
+        "timestamp": timestamp,
+        "input_data": input_data,
+        "prediction": prediction,
+        "probability": probability
+    }
+
+
+def _connect(database_file):
+    """Abre uma conexão SQLite; aceita caminhos ou URIs `file:` (ex.: banco em memória compartilhado)."""
+    return sqlite3.connect(database_file, uri=database_file.startswith('file:'))
+
+
+def _ensure_database_dir(database_file):
+    """Cria o diretório do arquivo do banco (nada a fazer para URIs `file:`)."""
+    if not database_file.startswith('file:'):
+        os.makedirs(os.path.dirname(database_file), exist_ok=True)
+
+
+def _stamp_records(records, timestamp=None):
+    """Preenche o timestamp dos registros que ainda não têm um."""
+    timestamp = timestamp or datetime.now().isoformat()
+    return [record if record["timestamp"] else {**record, "timestamp": timestamp} for record in records]
+
+
+class HistoryStorage(ABC):
+    """Interface dos backends de armazenamento do histórico de predições."""
+
+    # Backends que mantêm rollups pré-computados sobrescrevem com True
+    supports_rollups = False
+
+    @abstractmethod
+    def init(self):
+        """Cria tabelas/coleções e índices necessários."""
+
+    @abstractmethod
+    def add_many(self, records):
+        """Insere vários registros de uma vez (um único commit/round-trip)."""
+
+    @abstractmethod
+    def get_history(self, since_id=None, limit=None):
+        """
+        Sem `since_id`: mais recentes primeiro. Com `since_id`: id > since_id em ordem crescente.
+
+        Um id só pode ficar visível depois que todos os ids menores foram gravados;
+        caso contrário leitores incrementais (SSE, frontend, /stats) pulariam linhas.
+        """
+
+    @abstractmethod
+    def get_latest_id(self):
+        """Id da predição mais recente visível (0 se vazio)."""
+
+    def get_generation(self):
+        """
+        Contador incrementado quando linhas antigas são removidas (retenção).
+        Junto do id mais recente, identifica uma versão do histórico (ETag).
+        """
+        return 0
+
+    def run_maintenance(self):
+        """Retenção e compactação periódicas (nada a fazer por padrão)."""
+        return []
+
+
+class SQLiteHistoryStorage(HistoryStorage):
+    """Histórico em um arquivo SQLite (tabela `predictions_history`)."""
+
+    def __init__(self, database_file):
+        self.database_file = database_file
+
+    def init(self):
+        _ensure_database_dir(self.database_file)
+        conn = _connect(self.database_file)
+        cursor = conn.cursor()
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS predictions_history (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                timestamp TEXT NOT NULL,
+                input_data TEXT NOT NULL,
+                prediction INTEGER NOT NULL,
+                probability REAL NOT NULL
+            )
+        ''')
+        conn.commit()
+        conn.close()
+        print(f"Banco de dados SQLite inicializado em: {self.database_file}")
+
+    def add_many(self, records):
+        records = _stamp_records(records)
+        conn = _connect(self.database_file)
+        cursor = conn.cursor()
+        cursor.executemany(
+            "INSERT INTO predictions_history (timestamp, input_data, prediction, probability) VALUES (?, ?, ?, ?)",
+            [
+                # Armazena os dados de entrada como JSON
+                (r["timestamp"], json.dumps(r["input_data"]), r["prediction"], r["probability"])
+                for r in records
+            ]
         )
-    ''')
-    conn.commit()
-    conn.close()
-    print(f"Banco de dados SQLite inicializado em: {DATABASE_FILE}")
+        conn.commit()
+        conn.close()
+
+    def get_history(self, since_id=None, limit=None):
+        conn = _connect(self.database_file)
+        cursor = conn.cursor()
+        query = "SELECT id, timestamp, input_data, prediction, probability FROM predictions_history"
+        params = []
+        if since_id is not None:
+            query += " WHERE id > ? ORDER BY id ASC"
+            params.append(since_id)
+        else:
+            query += " ORDER BY timestamp DESC"
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit)
+        cursor.execute(query, params)
+        history = []
+        for row in cursor.fetchall():
+            record = {
+                "id": row[0],
+                "timestamp": row[1],
+                "input_data": json.loads(row[2]), # Carrega o JSON de volta para dict
+                "prediction": row[3],
+                "probability": row[4]
+            }
+            history.append(record)
+        conn.close()
+        return history
+
+    def get_latest_id(self):
+        conn = _connect(self.database_file)
+        cursor = conn.cursor()
+        cursor.execute("SELECT MAX(id) FROM predictions_history")
+        latest_id = cursor.fetchone()[0]
+        conn.close()
+        return latest_id or 0
+
+
+class MongoHistoryStorage(HistoryStorage):
+    """
+    Histórico em uma coleção MongoDB (`predictions_history`).
+
+    Os ids são inteiros sequenciais (reservados em bloco em `counters`) para
+    manter a mesma semântica de `since_id` do SQLite. Como a reserva e o
+    `insert_many` não são atômicos juntos, escritores concorrentes podem
+    terminar fora de ordem; por isso as leituras só enxergam ids até o
+    high-water mark `committed`, que avança apenas sobre faixas contíguas já
+    gravadas (registradas em `committed_ranges`). Se um processo morrer entre
+    a reserva e a gravação, o mark fica parado naquela faixa até ser ajustado
+    manualmente em `counters`.
+
+    Aceita um `client` já construído (ex.: mongomock) para testes e
+    benchmarks locais.
+    """
+
+    def __init__(self, uri=MONGO_URI, database=MONGO_DATABASE, client=None):
+        if client is None:
+            from pymongo import MongoClient
+            client = MongoClient(uri)
+        self.client = client
+        self.db = client[database]
+        self.collection = self.db['predictions_history']
+        self.counters = self.db['counters']
+        self.committed_ranges = self.db['committed_ranges']
+
+    def init(self):
+        from pymongo import DESCENDING
+        self.collection.create_index([("timestamp", DESCENDING)])
+        print(f"Coleção MongoDB inicializada em: {self.db.name}.{self.collection.name}")
+
+    def _reserve_ids(self, count):
+        """Reserva `count` ids consecutivos com um único $inc atômico."""
+        from pymongo import ReturnDocument
+        counter = self.counters.find_one_and_update(
+            {"_id": "predictions_history"},
+            {"$inc": {"seq": count}, "$setOnInsert": {"committed": 0}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        return counter["seq"] - count + 1
+
+    def _committed_id(self):
+        """High-water mark: maior id abaixo do qual todas as faixas reservadas já foram gravadas."""
+        counter = self.counters.find_one({"_id": "predictions_history"}, projection={"committed": 1})
+        return counter.get("committed", 0) if counter else 0
+
+    def _mark_committed(self, first_id, last_id):
+        """Registra a faixa como gravada e avança o high-water mark sobre as faixas contíguas."""
+        self.committed_ranges.insert_one({"_id": first_id, "last": last_id})
+        while True:
+            committed = self._committed_id()
+            done = self.committed_ranges.find_one({"_id": committed + 1})
+            if done is None:
+                # Uma faixa anterior ainda está sendo gravada: quem terminá-la avança o mark
+                return
+            # Compare-and-set: só um escritor avança cada faixa
+            result = self.counters.update_one(
+                {"_id": "predictions_history", "committed": committed},
+                {"$set": {"committed": done["last"]}}
+            )
+            if result.modified_count:
+                self.committed_ranges.delete_one({"_id": done["_id"]})
+
+    def add_many(self, records):
+        if not records:
+            return
+        first_id = self._reserve_ids(len(records))
+        documents = [{"_id": first_id + i, **record} for i, record in enumerate(_stamp_records(records))]
+        try:
+            self.collection.insert_many(documents, ordered=False)
+        finally:
+            # Mesmo se a gravação falhar, a faixa é liberada para não travar o mark
+            self._mark_committed(first_id, first_id + len(records) - 1)
+
+    def get_history(self, since_id=None, limit=None):
+        from pymongo import ASCENDING, DESCENDING
+        committed = self._committed_id()
+        if since_id is not None:
+            cursor = self.collection.find({"_id": {"$gt": since_id, "$lte": committed}}).sort("_id", ASCENDING)
+        else:
+            cursor = self.collection.find({"_id": {"$lte": committed}}).sort("timestamp", DESCENDING)
+        if limit is not None:
+            cursor = cursor.limit(limit)
+        cursor = cursor.batch_size(MONGO_CURSOR_BATCH_SIZE)
+        return [
+            {
+                "id": document["_id"],
+                "timestamp": document["timestamp"],
+                "input_data": document["input_data"],
+                "prediction": document["prediction"],
+                "probability": document["probability"]
+            }
+            for document in cursor
+        ]
+
+    def get_latest_id(self):
+        return self._committed_id()
+
+
+def create_storage(kind=None):
+    """Cria o backend de armazenamento configurado (HISTORY_STORAGE)."""
+    kind = kind or HISTORY_STORAGE
+    if kind == 'sqlite-partitioned':
+        from partitioned_history import PartitionedSQLiteHistoryStorage
+        return PartitionedSQLiteHistoryStorage(DATABASE_FILE)
+    if kind == 'sqlite':
+        return SQLiteHistoryStorage(DATABASE_FILE)
+    if kind == 'mongo':
+        return MongoHistoryStorage(MONGO_URI, MONGO_DATABASE)
+    raise ValueError(f"Backend de histórico desconhecido: {kind}")
+
+
+storage = None
+
+def init_db():
+    """Inicializa o backend de histórico configurado e cria a estrutura de armazenamento."""
+    global storage
+    storage = create_storage()
+    storage.init()
 
 def add_prediction_to_history(input_data: dict, prediction: int, probability: float):
     """Adiciona uma nova predição ao histórico."""
-    conn = sqlite3.connect(DATABASE_FILE)
-    cursor = conn.cursor()
-    timestamp = datetime.now().isoformat()
-    input_data_json = json.dumps(input_data) # Armazena os dados de entrada como JSON
-    cursor.execute(
-        "INSERT INTO predictions_history (timestamp, input_data, prediction, probability) VALUES (?, ?, ?, ?)",
-        (timestamp, input_data_json, prediction, probability)
-    )
-    conn.commit()
-    conn.close()
-
-def get_prediction_history():
-    """Recupera todo o histórico de predições."""
-    conn = sqlite3.connect(DATABASE_FILE)
-    cursor = conn.cursor()
-    cursor.execute("SELECT id, timestamp, input_data, prediction, probability FROM predictions_history ORDER BY timestamp DESC")
-    history = []
-    for row in cursor.fetchall():
-        record = {
-            "id": row[0],
-            "timestamp": row[1],
-            "input_data": json.loads(row[2]), # Carrega o JSON de volta para dict
-            "prediction": row[3],
-            "probability": row[4]
-        }
-        history.append(record)
-    conn.close()
-    return history
+    storage.add_many([_build_record(input_data, prediction, probability)])
+
+def add_predictions_to_history(predictions):
+    """Adiciona um lote de predições [(input_data, prediction, probability), ...] em uma única escrita."""
+    storage.add_many([_build_record(*prediction) for prediction in predictions])
+
+def get_latest_prediction_id():
+    """Retorna o id da predição mais recente (0 se o histórico estiver vazio)."""
+    return storage.get_latest_id()
+
+def get_prediction_history(since_id=None, limit=None):
+    """
+    Recupera o histórico de predições.
+
+    Sem `since_id`, retorna todo o histórico (mais recente primeiro). Com
+    `since_id`, retorna apenas as predições com id maior, em ordem crescente
+    de id, para sincronização incremental.
+    """
+    return storage.get_history(since_id=since_id, limit=limit)
+
+def get_history_generation():
+    """Geração do histórico (muda quando a retenção remove linhas antigas)."""
+    return storage.get_generation()
+
+def history_supports_rollups():
+    """True se o backend configurado mantém rollups pré-computados."""
+    return storage.supports_rollups
+
+def get_prediction_rollups(granularity='daily', start=None, end=None):
+    """Recupera os rollups (contagem por classe, probabilidade média, quantis) por hora ou dia."""
+    return storage.get_rollups(granularity=granularity, start=start, end=end)
+
+def start_history_maintenance(interval=HISTORY_MAINTENANCE_INTERVAL):
+    """Inicia uma thread em background que aplica retenção e compacta o histórico periodicamente."""
+    if interval <= 0:
+        return None
+    stop_event = threading.Event()
+
+    def run():
+        while not stop_event.wait(interval):
+            try:
+                storage.run_maintenance()
+            except Exception as e:
+                print(f"Erro na manutenção do histórico: {e}")
+
+    thread = threading.Thread(target=run, name='history-maintenance', daemon=True)
+    thread.start()
+    thread.stop_event = stop_event
+    return thread
 
 if __name__ == '__main__':
     # Este bloco será executado apenas se você rodar database.py diretamente
     init_db()
-    print("Teste: Banco de dados inicializado. Tabela 'predictions_history' criada (se não existia).")
\ No newline at end of file
+    print("Teste: Banco de dados inicializado. Tabela 'predictions_history' criada (se não existia).")
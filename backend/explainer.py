@@ -0,0 +1,131 @@
+import numpy as np
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler, OneHotEncoder
+
+
+def _map_transformed_features(preprocessor):
+    """
+    Mapeia cada coluna de saída do ColumnTransformer para a feature original.
+
+    Retorna uma lista (uma entrada por coluna transformada) de dicts com:
+      - feature: nome da coluna original
+      - kind: 'numeric' (transformação afim) ou 'category' (one-hot)
+      - scale/offset: para desfazer o StandardScaler (x = t * scale + offset)
+      - category: categoria representada pela coluna one-hot
+    """
+    mapping = []
+    for name, transformer, columns in preprocessor.transformers_:
+        if transformer == 'drop' or len(columns) == 0:
+            continue
+        if name == 'remainder':
+            # Colunas em 'passthrough' chegam como índices da entrada original
+            columns = [preprocessor.feature_names_in_[c] for c in columns]
+        columns = list(columns)
+
+        steps = transformer.steps if isinstance(transformer, Pipeline) else [(name, transformer)]
+        scaler = next((s for _, s in steps if isinstance(s, StandardScaler)), None)
+        encoder = next((s for _, s in steps if isinstance(s, OneHotEncoder)), None)
+
+        if encoder is not None:
+            for column, categories in zip(columns, encoder.categories_):
+                for category in categories:
+                    mapping.append({"feature": column, "kind": "category", "category": category})
+            continue
+
+        for j, column in enumerate(columns):
+            scale, offset = 1.0, 0.0
+            if scaler is not None:
+                scale = float(scaler.scale_[j]) if scaler.scale_ is not None else 1.0
+                offset = float(scaler.mean_[j]) if scaler.mean_ is not None else 0.0
+            mapping.append({"feature": column, "kind": "numeric", "scale": scale, "offset": offset})
+    return mapping
+
+
+def _to_original_condition(feature_map, threshold, goes_left):
+    """Converte um split (coluna transformada, threshold) em uma condição sobre a feature original."""
+    if feature_map["kind"] == "category":
+        # Coluna one-hot: <= 0.5 significa "não é a categoria"
+        return {
+            "feature": feature_map["feature"],
+            "category": str(feature_map["category"]),
+            "direction": "!=" if goes_left else "=="
+        }
+    return {
+        "feature": feature_map["feature"],
+        "threshold": round(threshold * feature_map["scale"] + feature_map["offset"], 4),
+        "direction": "<=" if goes_left else ">"
+    }
+
+
+class TreePathExplainer:
+    """
+    Explica predições de um Pipeline (ColumnTransformer + DecisionTreeClassifier)
+    pelo caminho de decisão percorrido na árvore.
+
+    Os caminhos são pré-computados por folha no carregamento, então explicar
+    custa um `apply` na árvore (o mesmo percurso de uma predição) mais uma
+    consulta em dicionário.
+    """
+
+    def __init__(self, pipeline):
+        self.preprocessor = pipeline.named_steps['preprocessor']
+        self.classifier = pipeline.named_steps['classifier']
+        self.tree = self.classifier.tree_
+        self.feature_map = _map_transformed_features(self.preprocessor)
+        self.leaf_paths = self._precompute_leaf_paths()
+
+    def _precompute_leaf_paths(self):
+        """Percorre a árvore uma única vez e guarda o caminho (raiz -> folha) de cada folha."""
+        tree = self.tree
+        leaf_paths = {}
+        stack = [(0, [])]
+        while stack:
+            node, path = stack.pop()
+            left, right = tree.children_left[node], tree.children_right[node]
+            if left == right:  # folha
+                leaf_paths[node] = path
+                continue
+            feature_map = self.feature_map[tree.feature[node]]
+            threshold = float(tree.threshold[node])
+            stack.append((left, path + [_to_original_condition(feature_map, threshold, True)]))
+            stack.append((right, path + [_to_original_condition(feature_map, threshold, False)]))
+        return leaf_paths
+
+    def apply(self, input_df):
+        """Retorna o id da folha atingida por cada linha de `input_df`."""
+        return self.classifier.apply(self.preprocessor.transform(input_df))
+
+    @staticmethod
+    def _mark_imputed(path, missing_features):
+        """
+        Marca com `imputed: True` as condições sobre features ausentes na entrada:
+        a árvore avaliou o valor imputado pelo pré-processamento, não um valor enviado.
+        """
+        if not missing_features:
+            return path
+        return [
+            {**condition, "imputed": True} if condition["feature"] in missing_features else condition
+            for condition in path
+        ]
+
+    def _paths(self, input_df, leaves):
+        missing = input_df.isna()
+        return [
+            self._mark_imputed(self.leaf_paths[leaf], set(missing.columns[missing.iloc[i].to_numpy()]))
+            for i, leaf in enumerate(leaves)
+        ]
+
+    def explain(self, input_df):
+        """Retorna o caminho de decisão de cada linha de `input_df` (suporta lotes)."""
+        return self._paths(input_df, self.apply(input_df))
+
+    def predict_with_explanation(self, input_df):
+        """
+        Prediz e explica em uma única passada: a distribuição de classes da folha
+        é a mesma usada por `predict_proba`, então não é preciso rodar o pipeline de novo.
+        """
+        leaves = self.apply(input_df)
+        values = self.tree.value[leaves, 0, :]
+        probabilities = values / values.sum(axis=1, keepdims=True)
+        predictions = self.classifier.classes_[np.argmax(probabilities, axis=1)]
+        return predictions, probabilities[:, 1], self._paths(input_df, leaves)
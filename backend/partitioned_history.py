@@ -0,0 +1,399 @@
+import os
+import json
+import gzip
+import math
+from datetime import datetime
+
+from database import HistoryStorage, _connect, _ensure_database_dir, _stamp_records
+
+# Meses de histórico bruto mantidos no banco (partições mais antigas vão para o arquivo morto)
+HISTORY_RETENTION_MONTHS = int(os.environ.get('HISTORY_RETENTION_MONTHS', 12))
+
+# Features com quantis nos rollups: (mínimo, máximo, número de faixas do histograma)
+ROLLUP_FEATURES = {
+    'MMSE': (0.0, 30.0, 60),
+    'ADL': (0.0, 10.0, 40),
+    'FunctionalAssessment': (0.0, 10.0, 40),
+    'Age': (60.0, 90.0, 30)
+}
+ROLLUP_QUANTILES = (0.25, 0.5, 0.75)
+
+# Granularidades dos rollups: prefixo do timestamp ISO que identifica o bucket
+ROLLUP_GRANULARITIES = {'hourly': 13, 'daily': 10}
+
+
+def _partition_month(timestamp):
+    """Mês (YYYY_MM) da partição de um timestamp ISO."""
+    return datetime.fromisoformat(timestamp).strftime('%Y_%m')
+
+
+def _histogram_bin(value, low, high, bins):
+    """Faixa do histograma de um valor (valores fora do intervalo vão para as faixas das pontas)."""
+    position = int((value - low) / (high - low) * bins)
+    return min(max(position, 0), bins - 1)
+
+
+def _histogram_quantile(counts, quantile, low, high):
+    """Quantil aproximado a partir de um histograma, interpolando dentro da faixa."""
+    total = sum(counts)
+    if total == 0:
+        return None
+    width = (high - low) / len(counts)
+    target = quantile * total
+    cumulative = 0
+    for i, count in enumerate(counts):
+        if count and cumulative + count >= target:
+            return round(low + width * (i + (target - cumulative) / count), 4)
+        cumulative += count
+    return high
+
+
+class PartitionedSQLiteHistoryStorage(HistoryStorage):
+    """
+    Histórico SQLite particionado por mês (`predictions_history_YYYY_MM`).
+
+    - Ids globais e sequenciais (`history_sequence`); o catálogo
+      `history_partitions` guarda o intervalo de ids de cada partição, então
+      leituras por `since_id` só tocam as partições necessárias.
+    - Rollups por hora e por dia (contagem por classe, soma de probabilidades
+      e histogramas de features para quantis) são atualizados na mesma
+      transação da inserção, então dashboards não leem linhas brutas.
+    - Partições além da retenção são arquivadas em JSON Lines comprimido
+      (`instance/archive`) e removidas; a manutenção só roda `compact`
+      (VACUUM, que bloqueia as escritas) quando alguma partição saiu.
+    """
+
+    supports_rollups = True
+
+    def __init__(self, database_file, retention_months=HISTORY_RETENTION_MONTHS):
+        self.database_file = database_file
+        self.retention_months = retention_months
+        self.archive_dir = os.path.join(os.path.dirname(database_file), 'archive')
+
+    def _connect(self):
+        return _connect(self.database_file)
+
+    def init(self):
+        _ensure_database_dir(self.database_file)
+        conn = self._connect()
+        cursor = conn.cursor()
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS history_sequence (
+                name TEXT PRIMARY KEY,
+                seq INTEGER NOT NULL
+            )
+        ''')
+        cursor.execute("INSERT OR IGNORE INTO history_sequence (name, seq) VALUES ('predictions_history', 0)")
+        # Geração do histórico: incrementada a cada partição removida pela retenção
+        cursor.execute("INSERT OR IGNORE INTO history_sequence (name, seq) VALUES ('retention_generation', 0)")
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS history_partitions (
+                month TEXT PRIMARY KEY,
+                table_name TEXT NOT NULL,
+                min_id INTEGER,
+                max_id INTEGER
+            )
+        ''')
+        for granularity in ROLLUP_GRANULARITIES:
+            cursor.execute(f'''
+                CREATE TABLE IF NOT EXISTS history_rollup_{granularity} (
+                    bucket TEXT PRIMARY KEY,
+                    count INTEGER NOT NULL,
+                    positives INTEGER NOT NULL,
+                    sum_probability REAL NOT NULL
+                )
+            ''')
+            cursor.execute(f'''
+                CREATE TABLE IF NOT EXISTS history_rollup_{granularity}_histogram (
+                    bucket TEXT NOT NULL,
+                    feature TEXT NOT NULL,
+                    bin INTEGER NOT NULL,
+                    count INTEGER NOT NULL,
+                    PRIMARY KEY (bucket, feature, bin)
+                )
+            ''')
+        conn.commit()
+        self._migrate_single_table(conn)
+        conn.close()
+        print(f"Banco de dados SQLite (particionado por mês) inicializado em: {self.database_file}")
+
+    def _migrate_single_table(self, conn):
+        """Move as linhas da tabela única `predictions_history` (formato antigo) para as partições."""
+        cursor = conn.cursor()
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'predictions_history'")
+        if cursor.fetchone() is None:
+            return
+        cursor.execute("SELECT id, timestamp, input_data, prediction, probability FROM predictions_history ORDER BY id")
+        rows = cursor.fetchall()
+        if rows:
+            self._insert_rows(cursor, rows)
+            cursor.execute(
+                "UPDATE history_sequence SET seq = MAX(seq, ?) WHERE name = 'predictions_history'",
+                (rows[-1][0],)
+            )
+        cursor.execute("DROP TABLE predictions_history")
+        conn.commit()
+        print(f"Histórico migrado para partições mensais: {len(rows)} registros")
+
+    def _ensure_partition(self, cursor, month):
+        table_name = f"predictions_history_{month}"
+        cursor.execute(f'''
+            CREATE TABLE IF NOT EXISTS {table_name} (
+                id INTEGER PRIMARY KEY,
+                timestamp TEXT NOT NULL,
+                input_data TEXT NOT NULL,
+                prediction INTEGER NOT NULL,
+                probability REAL NOT NULL
+            )
+        ''')
+        cursor.execute(
+            "INSERT OR IGNORE INTO history_partitions (month, table_name) VALUES (?, ?)",
+            (month, table_name)
+        )
+        return table_name
+
+    def _insert_rows(self, cursor, rows):
+        """Insere linhas (id, timestamp, input_json, prediction, probability) e atualiza os rollups."""
+        by_month = {}
+        for row in rows:
+            by_month.setdefault(_partition_month(row[1]), []).append(row)
+
+        for month, month_rows in by_month.items():
+            table_name = self._ensure_partition(cursor, month)
+            cursor.executemany(
+                f"INSERT INTO {table_name} (id, timestamp, input_data, prediction, probability) VALUES (?, ?, ?, ?, ?)",
+                month_rows
+            )
+            ids = [row[0] for row in month_rows]
+            cursor.execute('''
+                UPDATE history_partitions
+                SET min_id = MIN(COALESCE(min_id, :low), :low), max_id = MAX(COALESCE(max_id, :high), :high)
+                WHERE month = :month
+            ''', {"low": min(ids), "high": max(ids), "month": month})
+
+        self._update_rollups(cursor, rows)
+
+    @staticmethod
+    def _feature_bins(input_data):
+        """Faixas do histograma das features de rollup presentes em um registro."""
+        bins = []
+        for feature, (low, high, n_bins) in ROLLUP_FEATURES.items():
+            try:
+                value = float(input_data.get(feature))
+            except (TypeError, ValueError):
+                continue
+            if not math.isfinite(value):
+                continue
+            bins.append((feature, _histogram_bin(value, low, high, n_bins)))
+        return bins
+
+    def _update_rollups(self, cursor, rows):
+        """Agrega as linhas por bucket em memória e faz um upsert incremental por bucket."""
+        feature_bins = [self._feature_bins(json.loads(row[2])) for row in rows]
+        for granularity, prefix in ROLLUP_GRANULARITIES.items():
+            totals = {}
+            histograms = {}
+            for (_, timestamp, _, prediction, probability), bins in zip(rows, feature_bins):
+                bucket = timestamp[:prefix]
+                count, positives, sum_probability = totals.get(bucket, (0, 0, 0.0))
+                totals[bucket] = (count + 1, positives + int(prediction == 1), sum_probability + probability)
+                for feature, bin_index in bins:
+                    key = (bucket, feature, bin_index)
+                    histograms[key] = histograms.get(key, 0) + 1
+
+            cursor.executemany(f'''
+                INSERT INTO history_rollup_{granularity} (bucket, count, positives, sum_probability)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT(bucket) DO UPDATE SET
+                    count = count + excluded.count,
+                    positives = positives + excluded.positives,
+                    sum_probability = sum_probability + excluded.sum_probability
+            ''', [(bucket, *values) for bucket, values in totals.items()])
+            cursor.executemany(f'''
+                INSERT INTO history_rollup_{granularity}_histogram (bucket, feature, bin, count)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT(bucket, feature, bin) DO UPDATE SET count = count + excluded.count
+            ''', [(*key, count) for key, count in histograms.items()])
+
+    def add_many(self, records):
+        if not records:
+            return
+        conn = self._connect()
+        cursor = conn.cursor()
+        # Reserva os ids do lote na mesma transação da inserção
+        cursor.execute(
+            "UPDATE history_sequence SET seq = seq + ? WHERE name = 'predictions_history'",
+            (len(records),)
+        )
+        cursor.execute("SELECT seq FROM history_sequence WHERE name = 'predictions_history'")
+        first_id = cursor.fetchone()[0] - len(records) + 1
+        # Carimba o horário com o lock de escrita já obtido pelo UPDATE: ids e timestamps
+        # crescem juntos, então partições vizinhas não ficam com faixas de id sobrepostas
+        rows = [
+            (first_id + i, r["timestamp"], json.dumps(r["input_data"]), r["prediction"], r["probability"])
+            for i, r in enumerate(_stamp_records(records))
+        ]
+        self._insert_rows(cursor, rows)
+        conn.commit()
+        conn.close()
+
+    def get_history(self, since_id=None, limit=None):
+        conn = self._connect()
+        cursor = conn.cursor()
+        if since_id is not None:
+            cursor.execute(
+                "SELECT table_name FROM history_partitions WHERE max_id > ? ORDER BY min_id",
+                (since_id,)
+            )
+            order, where, params = "id ASC", "WHERE id > ?", [since_id]
+        else:
+            cursor.execute("SELECT table_name FROM history_partitions ORDER BY month DESC")
+            order, where, params = "timestamp DESC", "", []
+
+        rows = []
+        for (table_name,) in cursor.fetchall():
+            if since_id is None and limit is not None and len(rows) >= limit:
+                break
+            query = f"SELECT id, timestamp, input_data, prediction, probability FROM {table_name} {where} ORDER BY {order}"
+            query_params = list(params)
+            if limit is not None:
+                query += " LIMIT ?"
+                query_params.append(limit)
+            cursor.execute(query, query_params)
+            rows.extend(cursor.fetchall())
+        conn.close()
+
+        if since_id is not None:
+            # Faixas de id de partições vizinhas podem se sobrepor (ex.: timestamps explícitos
+            # ou migrados): junta as páginas de cada partição e ordena por id antes de cortar
+            rows.sort(key=lambda row: row[0])
+        if limit is not None:
+            rows = rows[:limit]
+        return [
+            {
+                "id": row[0],
+                "timestamp": row[1],
+                "input_data": json.loads(row[2]), # Carrega o JSON de volta para dict
+                "prediction": row[3],
+                "probability": row[4]
+            }
+            for row in rows
+        ]
+
+    def get_latest_id(self):
+        conn = self._connect()
+        cursor = conn.cursor()
+        cursor.execute("SELECT seq FROM history_sequence WHERE name = 'predictions_history'")
+        latest_id = cursor.fetchone()[0]
+        conn.close()
+        return latest_id
+
+    def get_generation(self):
+        conn = self._connect()
+        cursor = conn.cursor()
+        cursor.execute("SELECT seq FROM history_sequence WHERE name = 'retention_generation'")
+        generation = cursor.fetchone()[0]
+        conn.close()
+        return generation
+
+    def get_rollups(self, granularity='daily', start=None, end=None):
+        if granularity not in ROLLUP_GRANULARITIES:
+            raise ValueError(f"Granularidade inválida: {granularity} (use {', '.join(ROLLUP_GRANULARITIES)})")
+        conn = self._connect()
+        cursor = conn.cursor()
+        # `end` inclusivo também para buckets mais finos (ex.: end='2025-07-05' inclui '2025-07-05T23')
+        where, params = "WHERE bucket >= ? AND bucket <= ?", [start or '', (end or '9999') + '~']
+
+        cursor.execute(
+            f"SELECT bucket, count, positives, sum_probability FROM history_rollup_{granularity} {where} ORDER BY bucket",
+            params
+        )
+        rollups = {
+            bucket: {
+                "bucket": bucket,
+                "count": count,
+                "count_by_class": {"0": count - positives, "1": positives},
+                "mean_probability": sum_probability / count if count else None,
+                "quantiles": {}
+            }
+            for bucket, count, positives, sum_probability in cursor.fetchall()
+        }
+
+        cursor.execute(
+            f"SELECT bucket, feature, bin, count FROM history_rollup_{granularity}_histogram {where}",
+            params
+        )
+        histograms = {}
+        for bucket, feature, bin_index, count in cursor.fetchall():
+            if feature in ROLLUP_FEATURES:
+                counts = histograms.setdefault((bucket, feature), [0] * ROLLUP_FEATURES[feature][2])
+                counts[bin_index] = count
+        conn.close()
+
+        for (bucket, feature), counts in histograms.items():
+            low, high, _ = ROLLUP_FEATURES[feature]
+            rollups[bucket]["quantiles"][feature] = {
+                f"p{int(q * 100)}": _histogram_quantile(counts, q, low, high) for q in ROLLUP_QUANTILES
+            }
+        return list(rollups.values())
+
+    def apply_retention(self, now=None):
+        """
+        Arquiva (JSON Lines + gzip) e remove as partições mais antigas que a
+        retenção. Os rollups diários são mantidos; os horários seguem a retenção.
+        """
+        if not self.retention_months:
+            return []
+        now = now or datetime.now()
+        months = now.year * 12 + now.month - 1 - self.retention_months
+        cutoff = f"{months // 12:04d}_{months % 12 + 1:02d}"
+
+        conn = self._connect()
+        cursor = conn.cursor()
+        cursor.execute("SELECT month, table_name FROM history_partitions WHERE month <= ? ORDER BY month", (cutoff,))
+        archived = []
+        for month, table_name in cursor.fetchall():
+            os.makedirs(self.archive_dir, exist_ok=True)
+            archive_path = os.path.join(self.archive_dir, f"{table_name}.jsonl.gz")
+            rows = conn.execute(
+                f"SELECT id, timestamp, input_data, prediction, probability FROM {table_name} ORDER BY id"
+            )
+            # Escreve num arquivo temporário e só então substitui: se o processo morrer antes do
+            # DROP/commit, a próxima execução regrava o arquivo inteiro em vez de duplicar linhas
+            temp_path = archive_path + '.tmp'
+            with gzip.open(temp_path, 'wt', encoding='utf-8') as archive:
+                for row in rows:
+                    archive.write(json.dumps({
+                        "id": row[0],
+                        "timestamp": row[1],
+                        "input_data": json.loads(row[2]),
+                        "prediction": row[3],
+                        "probability": row[4]
+                    }) + "\n")
+            os.replace(temp_path, archive_path)
+            cursor.execute(f"DROP TABLE {table_name}")
+            cursor.execute("DELETE FROM history_partitions WHERE month = ?", (month,))
+            month_prefix = month.replace('_', '-')
+            cursor.execute("DELETE FROM history_rollup_hourly WHERE bucket LIKE ?", (month_prefix + '%',))
+            cursor.execute("DELETE FROM history_rollup_hourly_histogram WHERE bucket LIKE ?", (month_prefix + '%',))
+            cursor.execute("UPDATE history_sequence SET seq = seq + 1 WHERE name = 'retention_generation'")
+            conn.commit()
+            archived.append(archive_path)
+            print(f"Partição {table_name} arquivada em: {archive_path}")
+        conn.close()
+        return archived
+
+    def compact(self):
+        """Recupera o espaço das partições removidas (VACUUM) e atualiza estatísticas."""
+        conn = self._connect()
+        conn.execute("VACUUM")
+        conn.execute("PRAGMA optimize")
+        conn.close()
+
+    def run_maintenance(self):
+        archived = self.apply_retention()
+        # VACUUM bloqueia o banco inteiro (inclusive as escritas de /predict): só compacta
+        # quando alguma partição foi removida
+        if archived:
+            self.compact()
+        return archived
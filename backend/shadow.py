@@ -0,0 +1,120 @@
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+
+def _percentiles(values):
+    if not values:
+        return {"p50": None, "p95": None}
+    p50, p95 = np.percentile(list(values), [50, 95])
+    return {"p50": round(float(p50), 3), "p95": round(float(p95), 3)}
+
+
+class ShadowScorer:
+    """
+    Pontua um pipeline candidato em "shadow" sobre as mesmas entradas do /predict.
+
+    A pontuação roda em um pool de threads fora da thread da requisição; o
+    caminho primário só faz uma checagem de fila e um `submit`. Com a fila
+    acima de metade de `max_pending`, a amostragem cai linearmente até zero,
+    então o custo para o primário fica limitado mesmo sob carga.
+    """
+
+    def __init__(self, pipeline, max_workers=2, sample_rate=1.0, max_pending=64, recent_size=100):
+        self.pipeline = pipeline
+        self.sample_rate = sample_rate
+        self.max_pending = max_pending
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='shadow')
+        self.lock = threading.Lock()
+        self.pending = 0
+        self.submitted = 0
+        self.skipped = 0
+        self.scored = 0
+        self.agreements = 0
+        self.errors = 0
+        self.sum_abs_delta = 0.0
+        self.max_abs_delta = 0.0
+        self.latencies_ms = deque(maxlen=1000)
+        self.primary_latencies_ms = deque(maxlen=1000)
+        self.recent = deque(maxlen=recent_size)
+
+    def _effective_sample_rate(self):
+        """Taxa de amostragem atual: cheia até metade da fila, caindo linearmente até zero."""
+        soft_limit = self.max_pending / 2
+        if self.pending < soft_limit:
+            return self.sample_rate
+        if self.pending >= self.max_pending:
+            return 0.0
+        return self.sample_rate * (self.max_pending - self.pending) / (self.max_pending - soft_limit)
+
+    def submit(self, input_df, predictions, probabilities, primary_latency_ms):
+        """Agenda a pontuação shadow; retorna False se a requisição foi descartada pela amostragem."""
+        with self.lock:
+            if random.random() >= self._effective_sample_rate():
+                self.skipped += 1
+                return False
+            self.pending += 1
+            self.submitted += 1
+        self.executor.submit(self._score, input_df, predictions, probabilities, primary_latency_ms)
+        return True
+
+    def _score(self, input_df, predictions, probabilities, primary_latency_ms):
+        try:
+            start = time.perf_counter()
+            shadow_predictions = self.pipeline.predict(input_df)
+            shadow_probabilities = self.pipeline.predict_proba(input_df)[:, 1]
+            latency_ms = (time.perf_counter() - start) * 1000
+        except Exception as e:
+            print(f"Erro na pontuação shadow: {e}")
+            with self.lock:
+                self.pending -= 1
+                self.errors += 1
+            return
+
+        deltas = np.asarray(shadow_probabilities) - np.asarray(probabilities)
+        with self.lock:
+            self.pending -= 1
+            self.latencies_ms.append(latency_ms)
+            self.primary_latencies_ms.append(primary_latency_ms)
+            for i in range(len(deltas)):
+                agree = int(shadow_predictions[i]) == int(predictions[i])
+                self.scored += 1
+                self.agreements += int(agree)
+                self.sum_abs_delta += abs(float(deltas[i]))
+                self.max_abs_delta = max(self.max_abs_delta, abs(float(deltas[i])))
+                self.recent.append({
+                    "primary_prediction": int(predictions[i]),
+                    "shadow_prediction": int(shadow_predictions[i]),
+                    "primary_probability": float(probabilities[i]),
+                    "shadow_probability": float(shadow_probabilities[i]),
+                    "probability_delta": float(deltas[i]),
+                    "agree": agree,
+                    "primary_latency_ms": round(primary_latency_ms, 3),
+                    "shadow_latency_ms": round(latency_ms, 3)
+                })
+
+    def stats(self):
+        """Resumo da comparação entre candidato e produção."""
+        with self.lock:
+            return {
+                "submitted": self.submitted,
+                "skipped": self.skipped,
+                "pending": self.pending,
+                "scored": self.scored,
+                "errors": self.errors,
+                "current_sample_rate": round(self._effective_sample_rate(), 3),
+                "agreement_rate": self.agreements / self.scored if self.scored else None,
+                "mean_abs_probability_delta": self.sum_abs_delta / self.scored if self.scored else None,
+                "max_abs_probability_delta": self.max_abs_delta,
+                "shadow_latency_ms": _percentiles(self.latencies_ms),
+                "primary_latency_ms": _percentiles(self.primary_latencies_ms),
+                "recent": list(self.recent)
+            }
+
+    def shutdown(self, wait=True):
+        """Encerra o pool (aguardando as pontuações pendentes por padrão)."""
+        self.executor.shutdown(wait=wait)
@@ -6,6 +6,18 @@ a performance do modelo de Machine Learning.
 import pytest
 import sys
 import os
+import time
+import uuid
+import hashlib
+import inspect
+import sqlite3
+import tempfile
+import joblib
+
+# Permite importar os módulos do backend (app, database, explainer) nos testes
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+MODEL_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'trained_model')
 
 # Configurações básicas do pytest
 def pytest_configure(config):
@@ -15,6 +27,27 @@ def pytest_configure(config):
     config.addinivalue_line(
         "markers", "performance: marca testes de performance do modelo"
     )
+    config._suite_started_at = time.perf_counter()
+
+
+def pytest_terminal_summary(terminalreporter, exitstatus, config):
+    """Reporta o tempo total da suíte e o histórico de tempos por número de workers (pytest-xdist)."""
+    if hasattr(config, 'workerinput') or not hasattr(config, '_suite_started_at'):
+        return
+    wall_time = time.perf_counter() - config._suite_started_at
+    workers = config.getoption('numprocesses', None) or 0
+
+    # Sem o cacheprovider (-p no:cacheprovider) só a execução atual é reportada
+    cache = getattr(config, 'cache', None)
+    timings = {str(workers): round(wall_time, 2)}
+    if cache is not None:
+        timings = {**cache.get('suite/wall_time_by_workers', {}), **timings}
+        cache.set('suite/wall_time_by_workers', timings)
+
+    terminalreporter.write_sep("=", "tempo da suíte por número de workers")
+    terminalreporter.write_line(f"⏱️ Esta execução: {wall_time:.2f}s com {workers} worker(s) (0 = sem xdist)")
+    for count, seconds in sorted(timings.items(), key=lambda item: int(item[0])):
+        terminalreporter.write_line(f"   -n {count:<4} {seconds:>8.2f}s")
 
 @pytest.fixture(scope="session")
 def model_test_environment():
@@ -47,3 +80,93 @@ def model_test_environment():
         "base_dir": base_dir,
         "status": "ready"
     }
+
+@pytest.fixture(scope="session")
+def model_pipeline(model_test_environment):
+    """Pipeline treinado, carregado uma única vez por processo (worker do xdist)."""
+    return joblib.load(os.path.join(MODEL_DIR, 'best_model_pipeline.joblib'))
+
+
+@pytest.fixture(scope="session")
+def feature_columns(model_test_environment):
+    """Colunas de features esperadas pelo modelo."""
+    return joblib.load(os.path.join(MODEL_DIR, 'feature_columns.joblib'))
+
+
+@pytest.fixture(scope="session")
+def tree_explainer(model_pipeline):
+    """TreePathExplainer do pipeline (caminhos das folhas pré-computados uma vez)."""
+    from explainer import TreePathExplainer
+    return TreePathExplainer(model_pipeline)
+
+
+@pytest.fixture(scope="session")
+def dataset_cache(request, tmp_path_factory):
+    """
+    Cache em disco de datasets sintéticos, chaveado por nome, seed, tamanho e
+    por um hash do código que gera os dados.
+
+    Uso: `X, y = dataset_cache('nome', seed, n_samples, gerar, config)`, onde
+    `gerar()` retorna `(X, y)`. O hash cobre o código-fonte do módulo que
+    define `gerar` e o `config`, então alterar o gerador invalida o cache. O
+    arquivo fica em `.pytest_cache` (limpo com `--cache-clear`), ou em um
+    diretório temporário sem o cacheprovider, e é gravado de forma atômica:
+    workers paralelos podem gerar o mesmo dataset sem corromper o cache.
+    """
+    cache = getattr(request.config, 'cache', None)
+    if cache is not None:
+        cache_dir = str(cache.mkdir('synthetic_datasets'))
+    else:
+        cache_dir = str(tmp_path_factory.mktemp('synthetic_datasets'))
+    loaded = {}
+
+    def get(name, seed, n_samples, generate, config=None):
+        source = inspect.getsource(inspect.getmodule(generate))
+        digest = hashlib.sha256(f"{source}\n{config!r}".encode('utf-8')).hexdigest()[:12]
+        key = f"{name}_seed{seed}_n{n_samples}_{digest}"
+        if key not in loaded:
+            path = os.path.join(cache_dir, f"{key}.joblib")
+            if os.path.exists(path):
+                loaded[key] = joblib.load(path)
+            else:
+                loaded[key] = generate()
+                fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix='.tmp')
+                os.close(fd)
+                joblib.dump(loaded[key], tmp_path)
+                os.replace(tmp_path, path)
+        return loaded[key]
+
+    return get
+
+
+@pytest.fixture(scope="module")
+def app_module():
+    """
+    Módulo da aplicação Flask com o histórico em um SQLite em memória.
+
+    Cada módulo de teste recebe um banco novo (URI `mode=memory&cache=shared`
+    com nome único); uma conexão fica aberta durante o módulo para que o
+    banco não seja descartado entre as conexões abertas por requisição.
+    """
+    import database
+    database.DATABASE_FILE = f"file:history_{uuid.uuid4().hex}?mode=memory&cache=shared"
+    keeper = sqlite3.connect(database.DATABASE_FILE, uri=True)
+    import app as app_module
+    database.init_db()
+    app_module.app.config['TESTING'] = True
+    # Todas as requisições de teste vêm do mesmo endereço: sem rate limit por padrão
+    app_module.admission_controller.rate = app_module.admission_controller.burst = 1e9
+    yield app_module
+    keeper.close()
+
+
+@pytest.fixture
+def client(app_module):
+    """Cliente de teste do Flask."""
+    return app_module.app.test_client()
+
+
+@pytest.fixture
+def patient(app_module):
+    """Paciente com todas as features preenchidas."""
+    return {feature: 1 for feature in app_module.feature_columns}
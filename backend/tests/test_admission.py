@@ -0,0 +1,134 @@
+"""
+Testes do controle de admissão: rate limit, fila por prioridade e shedding por deadline.
+"""
+
+import pytest
+import threading
+import time
+
+from admission import AdmissionController, AdmissionRejected, TokenBucket
+
+
+def _controller(**overrides):
+    config = dict(
+        rate=100.0, burst=100.0, max_concurrent=1,
+        max_queue={'interactive': 4, 'batch': 4},
+        max_wait_seconds={'interactive': 2.0, 'batch': 2.0}
+    )
+    config.update(overrides)
+    return AdmissionController(**config)
+
+
+class TestAdmissionController:
+    """Valida cada mecanismo do controle de admissão isoladamente."""
+
+    def test_token_bucket_refills_over_time(self):
+        """O bucket recusa acima do burst e informa a espera até o próximo token."""
+        bucket = TokenBucket(rate=10, burst=2)
+        assert bucket.take() == 0 and bucket.take() == 0
+        wait = bucket.take()
+        assert 0 < wait <= 0.1
+
+    def test_rate_limit_is_per_client(self):
+        """Cada cliente tem seu próprio bucket; o excesso gera 429 com Retry-After."""
+        controller = _controller(rate=0.5, burst=1, max_concurrent=10)
+        controller.release(controller.acquire('a'))
+        with pytest.raises(AdmissionRejected) as rejected:
+            controller.acquire('a')
+        assert rejected.value.status == 429
+        assert rejected.value.retry_after >= 1
+
+        controller.release(controller.acquire('b'))
+        assert controller.metrics()['rate_limited']['interactive'] == 1
+
+    def test_queue_full_is_shed_with_503(self):
+        """Com todos os slots ocupados e a fila cheia, a requisição é recusada com 503."""
+        controller = _controller(max_queue={'interactive': 0, 'batch': 0})
+        started_at = controller.acquire('a')
+        with pytest.raises(AdmissionRejected) as rejected:
+            controller.acquire('b')
+        assert rejected.value.status == 503
+        controller.release(started_at)
+        assert controller.metrics()['shed_queue_full']['interactive'] == 1
+
+    def test_deadline_shorter_than_estimated_wait_is_shed(self):
+        """Uma requisição cujo prazo não cobre a espera estimada é recusada sem entrar na fila."""
+        controller = _controller()
+        controller.service_time_ewma = 1.0
+        started_at = controller.acquire('a')
+        with pytest.raises(AdmissionRejected):
+            controller.acquire('b', deadline_seconds=0.1)
+        assert controller.metrics()['waiting'] == {'interactive': 0, 'batch': 0}
+        assert controller.metrics()['shed_deadline']['interactive'] == 1
+        controller.release(started_at)
+
+    def test_interactive_is_served_before_batch(self):
+        """Ao liberar o slot, o interativo em espera passa na frente do lote."""
+        controller = _controller()
+        controller.service_time_ewma = 0.001
+        started_at = controller.acquire('holder')
+        order = []
+
+        def worker(priority, delay):
+            time.sleep(delay)
+            slot = controller.acquire(priority, priority=priority)
+            order.append(priority)
+            time.sleep(0.01)
+            controller.release(slot)
+
+        threads = [
+            threading.Thread(target=worker, args=('batch', 0.0)),
+            threading.Thread(target=worker, args=('interactive', 0.05)),
+        ]
+        for thread in threads:
+            thread.start()
+        time.sleep(0.15)
+        controller.release(started_at)
+        for thread in threads:
+            thread.join()
+
+        assert order == ['interactive', 'batch']
+
+    def test_predict_returns_429_with_retry_after(self, client, patient, app_module, monkeypatch):
+        """A rota /predict aplica o controle antes de pontuar."""
+        controller = app_module.admission_controller
+        monkeypatch.setattr(controller, 'rate', 0.01)
+        monkeypatch.setattr(controller, 'burst', 1)
+        monkeypatch.setattr(controller, 'buckets', type(controller.buckets)())
+
+        assert client.post('/predict', json=patient).status_code == 200
+        rejected = client.post('/predict', json=patient)
+        assert rejected.status_code == 429
+        assert int(rejected.headers['Retry-After']) >= 1
+
+        metrics = client.get('/metrics/admission').get_json()
+        assert metrics['rate_limited']['interactive'] >= 1
+
+    def test_batch_larger_than_burst_is_rejected(self):
+        """Um lote maior que o burst é recusado com 413; lotes menores custam um token por paciente."""
+        controller = _controller(rate=0.01, burst=5, max_concurrent=10)
+        with pytest.raises(AdmissionRejected) as rejected:
+            controller.acquire('a', 'batch', cost=6)
+        assert rejected.value.status == 413
+        assert rejected.value.retry_after is None
+        assert controller.metrics()['too_large']['batch'] == 1
+
+        controller.release(controller.acquire('a', 'batch', cost=5))
+        with pytest.raises(AdmissionRejected) as rejected:
+            controller.acquire('a')
+        assert rejected.value.status == 429
+
+    def test_predict_rejects_batch_larger_than_burst(self, client, patient, app_module, monkeypatch):
+        """/predict recusa com 413 (sem Retry-After) um lote que excede o burst."""
+        controller = app_module.admission_controller
+        monkeypatch.setattr(controller, 'burst', 3)
+        monkeypatch.setattr(controller, 'buckets', type(controller.buckets)())
+
+        rejected = client.post('/predict', json=[patient] * 4)
+        assert rejected.status_code == 413
+        assert 'Retry-After' not in rejected.headers
+        assert client.post('/predict', json=[patient] * 3).status_code == 200
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--tb=short"])
@@ -0,0 +1,153 @@
+"""
+Testes das estatísticas de coorte (CohortStats) e do endpoint /stats.
+Compara os agregados vetorizados com um groupby do pandas sobre os mesmos registros.
+"""
+
+import pytest
+import numpy as np
+import pandas as pd
+
+from database import SQLiteHistoryStorage
+import cohort_stats
+from cohort_stats import CohortStats, STATS_PROBABILITY_BINS
+
+
+def _records(n, seed, timestamp='2025-07-01T12:00:00'):
+    rng = np.random.default_rng(seed)
+    probabilities = rng.uniform(0, 1, n)
+    return [
+        {
+            "timestamp": timestamp,
+            "input_data": {
+                "Age": float(rng.uniform(60, 95)),
+                "MMSE": float(rng.uniform(0, 30)),
+                "EducationLevel": int(rng.integers(0, 4))
+            },
+            "prediction": int(probabilities[i] >= 0.5),
+            "probability": float(probabilities[i])
+        }
+        for i in range(n)
+    ]
+
+
+@pytest.fixture
+def storage(tmp_path):
+    """Histórico SQLite com 2000 predições."""
+    storage = SQLiteHistoryStorage(str(tmp_path / "site.db"))
+    storage.init()
+    storage.add_many(_records(2000, seed=1))
+    return storage
+
+
+@pytest.fixture
+def stats(storage):
+    """Estatísticas de coorte sobre o histórico do fixture `storage`."""
+    return CohortStats(storage.get_history, storage.get_latest_id)
+
+
+def _expected(storage, group_by):
+    frame = pd.DataFrame([
+        {**record["input_data"], "prediction": record["prediction"], "probability": record["probability"]}
+        for record in storage.get_history()
+    ])
+    frame['age_band'] = pd.cut(frame['Age'], [-np.inf, 65, 70, 75, 80, 85, 90, np.inf], right=False,
+                               labels=['<65', '65-70', '70-75', '75-80', '80-85', '85-90', '90+'])
+    return frame.groupby(list(group_by), observed=True).agg(
+        count=('prediction', 'size'), positives=('prediction', 'sum'), median=('probability', 'median')
+    )
+
+
+class TestCohortStats:
+    """Valida agregados, quantis, atualização incremental e cache por formato de consulta."""
+
+    def test_grouped_counts_and_rates_match_pandas(self, stats, storage):
+        """Contagens e taxas de positivos batem com o groupby do pandas."""
+        result = stats.query(['age_band', 'EducationLevel'])
+        expected = _expected(storage, ['age_band', 'EducationLevel'])
+
+        assert result["total"] == 2000
+        assert len(result["groups"]) == len(expected)
+        for group in result["groups"]:
+            row = expected.loc[(group["age_band"], group["EducationLevel"])]
+            assert group["count"] == row["count"]
+            assert group["positives"] == row["positives"]
+            assert group["positive_rate"] == pytest.approx(row["positives"] / row["count"], abs=1e-4)
+
+    def test_quantiles_within_histogram_resolution(self, stats, storage):
+        """Mediana aproximada pelo histograma fica a poucas faixas da mediana exata."""
+        result = stats.query(['EducationLevel'])
+        expected = _expected(storage, ['EducationLevel'])
+        for group in result["groups"]:
+            exact = expected.loc[group["EducationLevel"], "median"]
+            assert group["probability_quantiles"]["p50"] == pytest.approx(exact, abs=5 / STATS_PROBABILITY_BINS)
+
+    def test_groups_are_sorted_by_band_and_value(self, stats):
+        """Faixas seguem a ordem dos limites e categorias a ordem dos valores."""
+        result = stats.query(['mmse_bucket'])
+        assert [g["mmse_bucket"] for g in result["groups"]] == ['<10', '10-18', '18-24', '24+']
+        result = stats.query(['EducationLevel'])
+        assert [g["EducationLevel"] for g in result["groups"]] == [0, 1, 2, 3]
+
+    def test_out_of_domain_categories_share_one_group(self, stats, storage):
+        """Valores categóricos fora do domínio (muitos distintos) vão para 'other' sem estourar os códigos."""
+        records = _records(40000, seed=4)
+        for i, record in enumerate(records):
+            record["input_data"]["EducationLevel"] = 1.37 + i if i % 2 else f"nivel-{i}"
+        records[0]["input_data"]["EducationLevel"] = None
+        storage.add_many(records)
+
+        result = stats.query(['EducationLevel', 'age_band'])
+        assert result["total"] == 42000
+        by_level = {}
+        for group in result["groups"]:
+            by_level[group["EducationLevel"]] = by_level.get(group["EducationLevel"], 0) + group["count"]
+        assert list(by_level) == [0, 1, 2, 3, 'other', None]
+        assert by_level['other'] == 39999 and by_level[None] == 1
+        assert len(stats.dimensions['EducationLevel'].labels) == 6
+
+    def test_snapshot_is_refreshed_incrementally(self, stats, storage, monkeypatch):
+        """Novas predições entram no snapshot sem reler as antigas; o cache é reaproveitado sem novidades."""
+        first = stats.query([])
+        assert stats.query([]) is first
+
+        monkeypatch.setattr(cohort_stats, 'STATS_SYNC_PAGE_SIZE', 7)
+        requested = []
+        fetch_history = stats.fetch_history
+        stats.fetch_history = lambda since_id, limit: requested.append(since_id) or fetch_history(since_id, limit)
+        storage.add_many(_records(20, seed=2))
+
+        result = stats.query([])
+        assert result["total"] == 2020
+        assert result["as_of_id"] == 2020
+        assert requested == [2000, 2007, 2014]
+
+    def test_time_window_filter(self, stats, storage):
+        """start/end restringem as predições consideradas (start inclusivo, end exclusivo)."""
+        storage.add_many(_records(10, seed=3, timestamp='2025-08-15T09:30:00'))
+        assert stats.query([], start='2025-08-01')["total"] == 10
+        assert stats.query([], end='2025-08-01')["total"] == 2000
+        assert stats.query([], start='2025-08-16')["groups"] == []
+
+    def test_invalid_queries(self, stats):
+        """Dimensões desconhecidas, repetidas ou datas inválidas geram ValueError."""
+        with pytest.raises(ValueError):
+            stats.query(['Weight'])
+        with pytest.raises(ValueError):
+            stats.query(['Gender', 'Gender'])
+        with pytest.raises(ValueError):
+            stats.query([], start='ontem')
+
+    def test_stats_endpoint(self, client, patient):
+        """/stats agrupa as predições do histórico e rejeita dimensões inválidas com 400."""
+        client.post('/predict', json=[{**patient, "Age": 72}, {**patient, "Age": 91}])
+
+        response = client.get('/stats?group_by=age_band')
+        assert response.status_code == 200
+        bands = {group["age_band"]: group["count"] for group in response.get_json()["groups"]}
+        assert bands["70-75"] >= 1 and bands["90+"] >= 1
+
+        assert client.get('/stats?group_by=Weight').status_code == 400
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--tb=short"])
@@ -0,0 +1,95 @@
+"""
+Testes da análise what-if (CounterfactualExplorer).
+Garante que as regiões enumeradas e os contrafactuais são consistentes com o pipeline.
+"""
+
+import pytest
+import pandas as pd
+
+from counterfactual import CounterfactualExplorer
+
+
+class TestCounterfactualExplorer:
+    """Testes de enumeração de regiões e contrafactuais mínimos."""
+
+    VARY = ['MMSE', 'ADL', 'FunctionalAssessment']
+
+    @pytest.fixture(autouse=True, scope="class")
+    @classmethod
+    def _shared_artifacts(cls, model_pipeline, feature_columns, tree_explainer):
+        """Setup inicial: usa o pipeline da sessão e monta um paciente de alto risco."""
+        cls.model = model_pipeline
+        cls.feature_columns = feature_columns
+        cls.explorer = CounterfactualExplorer(tree_explainer)
+
+        patient = {feature: 1 for feature in cls.feature_columns}
+        patient.update({'MMSE': 10, 'ADL': 3, 'FunctionalAssessment': 3, 'DoctorInCharge': 'XXXConfid'})
+        cls.patient = pd.DataFrame([patient], columns=cls.feature_columns)
+
+    def _apply_changes(self, changes):
+        case = self.patient.copy()
+        for change in changes:
+            case[change['feature']] = change['to']
+        return case
+
+    def test_current_prediction_matches_pipeline(self):
+        """A predição atual reportada é a mesma do pipeline."""
+        result = self.explorer.explore(self.patient, self.VARY)
+        assert result['prediction'] == self.model.predict(self.patient)[0]
+
+    def test_every_region_point_scores_as_reported(self):
+        """O ponto mais próximo de cada região recebe a predição informada pela região."""
+        result = self.explorer.explore(self.patient, self.VARY)
+        assert result['regions_explored'] == len(result['regions']) > 1
+
+        cases = pd.concat([self._apply_changes(r['changes']) for r in result['regions']])
+        assert list(self.model.predict(cases)) == [r['prediction'] for r in result['regions']]
+
+    def test_counterfactuals_flip_prediction_within_bounds(self):
+        """Contrafactuais invertem a predição, respeitam os limites e vêm ordenados por distância."""
+        result = self.explorer.explore(self.patient, {'MMSE': [0, 30], 'ADL': [0, 10]})
+        counterfactuals = result['counterfactuals']
+
+        assert counterfactuals, "Nenhum contrafactual encontrado"
+        distances = [c['distance'] for c in counterfactuals]
+        assert distances == sorted(distances)
+        for counterfactual in counterfactuals:
+            assert 'FunctionalAssessment' not in {c['feature'] for c in counterfactual['changes']}
+            assert all(0 <= c['to'] <= 30 for c in counterfactual['changes'])
+            case = self._apply_changes(counterfactual['changes'])
+            assert self.model.predict(case)[0] != result['prediction']
+
+    def test_rejects_non_numeric_feature(self):
+        """Features categóricas (one-hot) não podem ser variadas."""
+        with pytest.raises(ValueError):
+            self.explorer.explore(self.patient, ['DoctorInCharge'])
+
+    @pytest.mark.parametrize("vary, max_results", [
+        ("MMSE", 5),
+        ({"MMSE": ["a", 30]}, 5),
+        ({"MMSE": [0, 10, 30]}, 5),
+        ({"MMSE": 30}, 5),
+        (["MMSE"], -1),
+        (["MMSE"], 0),
+        (["MMSE"], "5"),
+    ])
+    def test_rejects_malformed_vary_and_max_results(self, vary, max_results):
+        """vary em string, limites não numéricos ou fora de par e max_results < 1 geram ValueError."""
+        with pytest.raises(ValueError):
+            self.explorer.explore(self.patient, vary, max_results=max_results)
+
+    def test_what_if_endpoint_returns_400_on_malformed_body(self, client, patient):
+        """Corpo que não é objeto ou parâmetros inválidos retornam 400 em JSON (não 500)."""
+        assert client.post('/what-if', json=[patient]).status_code == 400
+        response = client.post('/what-if', json={"patient": patient, "vary": "MMSE"})
+        assert response.status_code == 400 and "error" in response.get_json()
+        response = client.post('/what-if', json={"patient": patient, "vary": {"MMSE": ["a", 30]}})
+        assert response.status_code == 400
+        response = client.post('/what-if', json={"patient": patient, "vary": ["MMSE"], "max_results": -1})
+        assert response.status_code == 400
+        response = client.post('/what-if', json={"patient": patient, "vary": {"MMSE": [0, 30]}})
+        assert response.status_code == 200
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--tb=short"])
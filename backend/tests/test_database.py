@@ -0,0 +1,98 @@
+"""
+Testes dos backends de armazenamento do histórico (SQLite, SQLite particionado e MongoDB).
+O backend MongoDB é testado contra o mongomock, quando disponível.
+"""
+
+import pytest
+
+from database import SQLiteHistoryStorage, MongoHistoryStorage, _build_record
+from partitioned_history import PartitionedSQLiteHistoryStorage
+
+
+@pytest.fixture(params=['sqlite', 'sqlite-partitioned', 'mongo'])
+def storage(request, tmp_path):
+    """Instância vazia de cada backend de histórico."""
+    if request.param == 'sqlite':
+        storage = SQLiteHistoryStorage(str(tmp_path / "site.db"))
+    elif request.param == 'sqlite-partitioned':
+        storage = PartitionedSQLiteHistoryStorage(str(tmp_path / "site.db"))
+    else:
+        mongomock = pytest.importorskip("mongomock")
+        storage = MongoHistoryStorage(client=mongomock.MongoClient())
+    storage.init()
+    return storage
+
+
+def _records(n, offset=0):
+    return [_build_record({"MMSE": offset + i}, (offset + i) % 2, (offset + i) / 100) for i in range(n)]
+
+
+class TestHistoryStorage:
+    """Os dois backends devem ter o mesmo comportamento observável."""
+
+    def test_empty_storage(self, storage):
+        """Histórico vazio: sem registros e id mais recente igual a 0."""
+        assert storage.get_history() == []
+        assert storage.get_latest_id() == 0
+
+    def test_bulk_insert_assigns_sequential_ids(self, storage):
+        """Inserções em lote recebem ids sequenciais, também entre lotes."""
+        storage.add_many(_records(3))
+        storage.add_many(_records(2, offset=3))
+
+        history = storage.get_history(since_id=0)
+        assert [record["id"] for record in history] == [1, 2, 3, 4, 5]
+        assert [record["input_data"]["MMSE"] for record in history] == [0, 1, 2, 3, 4]
+        assert storage.get_latest_id() == 5
+
+    def test_paged_reads_with_since_id(self, storage):
+        """since_id + limit paginam em ordem crescente de id."""
+        storage.add_many(_records(10))
+
+        first_page = storage.get_history(since_id=0, limit=4)
+        second_page = storage.get_history(since_id=first_page[-1]["id"], limit=4)
+        assert [r["id"] for r in first_page] == [1, 2, 3, 4]
+        assert [r["id"] for r in second_page] == [5, 6, 7, 8]
+
+    def test_full_history_has_all_fields(self, storage):
+        """O histórico completo traz todos os campos do registro."""
+        storage.add_many(_records(2))
+
+        history = storage.get_history()
+        assert len(history) == 2
+        assert set(history[0]) == {"id", "timestamp", "input_data", "prediction", "probability"}
+
+
+class TestMongoCommittedMark:
+    """No MongoDB, ids só ficam visíveis quando todas as faixas anteriores já foram gravadas."""
+
+    def test_out_of_order_commits_are_hidden_until_contiguous(self):
+        """Se o escritor B grava antes de A, os ids de B só aparecem depois que A termina."""
+        mongomock = pytest.importorskip("mongomock")
+        storage = MongoHistoryStorage(client=mongomock.MongoClient())
+        storage.init()
+
+        first_a = storage._reserve_ids(3)
+        first_b = storage._reserve_ids(2)
+        storage.collection.insert_many([{"_id": first_b + i, **r} for i, r in enumerate(_records(2, offset=3))])
+        storage._mark_committed(first_b, first_b + 1)
+
+        assert storage.get_latest_id() == 0
+        assert storage.get_history(since_id=0) == []
+
+        storage.collection.insert_many([{"_id": first_a + i, **r} for i, r in enumerate(_records(3))])
+        storage._mark_committed(first_a, first_a + 2)
+
+        assert storage.get_latest_id() == 5
+        assert [record["id"] for record in storage.get_history(since_id=0)] == [1, 2, 3, 4, 5]
+        assert storage.committed_ranges.count_documents({}) == 0
+
+    def test_interface_is_abstract(self):
+        """HistoryStorage não pode ser instanciada sem implementar os métodos abstratos."""
+        from database import HistoryStorage
+        with pytest.raises(TypeError):
+            HistoryStorage()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--tb=short"])
@@ -0,0 +1,79 @@
+"""
+Testes do explicador de caminhos de decisão (TreePathExplainer).
+Garante que a explicação é consistente com o pipeline e usa nomes de features originais.
+"""
+
+import pytest
+import pandas as pd
+import numpy as np
+
+
+class TestTreePathExplainer:
+    """Testes do mapeamento de caminhos da árvore para as features originais."""
+
+    @pytest.fixture(autouse=True, scope="class")
+    @classmethod
+    def _shared_artifacts(cls, model_pipeline, feature_columns, tree_explainer):
+        """Setup inicial: usa o pipeline da sessão e monta um lote de pacientes."""
+        cls.model = model_pipeline
+        cls.feature_columns = feature_columns
+        cls.explainer = tree_explainer
+
+        np.random.seed(42)
+        n_samples = 200
+        data = {feature: np.random.uniform(0, 10, n_samples) for feature in cls.feature_columns}
+        data['MMSE'] = np.random.uniform(0, 30, n_samples)
+        data['Age'] = np.random.uniform(60, 90, n_samples)
+        data['DoctorInCharge'] = np.random.choice(['XXXConfid', 'Outro'], n_samples)
+        cls.X = pd.DataFrame(data)[cls.feature_columns]
+
+    def test_every_leaf_has_precomputed_path(self):
+        """Todas as folhas da árvore têm caminho pré-computado."""
+        tree = self.explainer.tree
+        n_leaves = int(np.sum(tree.children_left == tree.children_right))
+        assert len(self.explainer.leaf_paths) == n_leaves
+
+    def test_prediction_matches_pipeline(self):
+        """Predição e probabilidade da passada única coincidem com o pipeline."""
+        predictions, probabilities, paths = self.explainer.predict_with_explanation(self.X)
+
+        assert np.array_equal(predictions, self.model.predict(self.X))
+        assert np.allclose(probabilities, self.model.predict_proba(self.X)[:, 1])
+        assert len(paths) == len(self.X)
+
+    def test_path_uses_original_feature_names_and_scale(self):
+        """Cada condição do caminho é satisfeita pelo valor original do paciente."""
+        paths = self.explainer.explain(self.X)
+
+        for (_, row), path in zip(self.X.iterrows(), paths):
+            assert path, "Caminho vazio"
+            for condition in path:
+                assert condition['feature'] in self.feature_columns
+                value = row[condition['feature']]
+                if condition['direction'] == '<=':
+                    assert value <= condition['threshold'] + 1e-3
+                elif condition['direction'] == '>':
+                    assert value > condition['threshold'] - 1e-3
+                elif condition['direction'] == '==':
+                    assert str(value) == condition['category']
+                else:
+                    assert str(value) != condition['category']
+
+    def test_missing_features_are_marked_as_imputed(self):
+        """Condições sobre features ausentes (NaN) são marcadas como imputadas; as demais não."""
+        case = self.X.iloc[[0]].copy()
+        case['MMSE'] = np.nan
+        path = self.explainer.explain(case)[0]
+        _, _, batch_paths = self.explainer.predict_with_explanation(case)
+
+        assert batch_paths[0] == path
+        assert any(condition['feature'] == 'MMSE' for condition in path)
+        for condition in path:
+            assert condition.get('imputed', False) == (condition['feature'] == 'MMSE')
+        # O caminho pré-computado da folha não é alterado
+        leaf = self.explainer.apply(case)[0]
+        assert all('imputed' not in condition for condition in self.explainer.leaf_paths[leaf])
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--tb=short"])
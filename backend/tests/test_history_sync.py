@@ -0,0 +1,52 @@
+"""
+Testes da sincronização incremental do histórico (since_id e server-sent events).
+"""
+
+import pytest
+import json
+
+
+class TestHistorySync:
+    """Valida a paginação por since_id e o stream SSE de novas predições."""
+
+    def test_since_id_returns_only_new_rows_in_ascending_order(self, client, patient):
+        """since_id retorna só as predições posteriores, em ordem crescente de id."""
+        for _ in range(4):
+            client.post('/predict', json=patient)
+        ids = [record['id'] for record in client.get('/history').get_json()]
+
+        newer = client.get(f'/history?since_id={min(ids)}').get_json()
+        assert [record['id'] for record in newer] == sorted(ids)[1:]
+
+        assert client.get(f'/history?since_id={max(ids)}').get_json() == []
+
+    def test_since_id_pages_with_limit(self, client, patient):
+        """O limite corta a página e o último id serve de cursor para a próxima."""
+        for _ in range(3):
+            client.post('/predict', json=patient)
+
+        first_page = client.get('/history?since_id=0&limit=2').get_json()
+        second_page = client.get(f'/history?since_id={first_page[-1]["id"]}&limit=2').get_json()
+        assert len(first_page) == 2
+        assert second_page[0]['id'] == first_page[-1]['id'] + 1
+
+    def test_stream_sends_new_predictions_as_events(self, client, patient, app_module, monkeypatch):
+        """O stream SSE envia cada nova predição com o id como id do evento."""
+        monkeypatch.setattr(app_module, 'HISTORY_STREAM_POLL_SECONDS', 0.01)
+        last_id = app_module.get_latest_prediction_id()
+        client.post('/predict', json=patient)
+
+        response = client.get(f'/history/stream?since_id={last_id}', buffered=False)
+        assert response.mimetype == 'text/event-stream'
+        chunks = iter(response.response)
+        assert next(chunks).startswith(b'retry:')
+
+        event = next(chunks).decode('utf-8')
+        response.close()
+        event_id, data = event.strip().split('\n')
+        assert event_id == f'id: {last_id + 1}'
+        assert json.loads(data[len('data: '):])['id'] == last_id + 1
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--tb=short"])
@@ -0,0 +1,76 @@
+"""
+Testes de compressão, ETags e cache HTTP da API e do frontend estático.
+"""
+
+import pytest
+
+
+class TestHttpCache:
+    """Valida ETags do histórico, compressão e cache de assets versionados."""
+
+    def test_history_returns_304_until_new_prediction(self, client, patient):
+        """/history responde 304 enquanto o último id não muda."""
+        client.post('/predict', json=patient)
+        first = client.get('/history')
+        assert first.status_code == 200
+        etag = first.headers['ETag']
+
+        unchanged = client.get('/history', headers={'If-None-Match': etag})
+        assert unchanged.status_code == 304
+        assert unchanged.data == b''
+
+        client.post('/predict', json=patient)
+        changed = client.get('/history', headers={'If-None-Match': etag})
+        assert changed.status_code == 200
+        assert changed.headers['ETag'] != etag
+
+    def test_history_etag_changes_after_retention(self, client, patient, app_module, monkeypatch):
+        """Retenção remove linhas sem mudar o último id: a geração no ETag invalida o cache."""
+        client.post('/predict', json=patient)
+        etag = client.get('/history').headers['ETag']
+
+        generation = app_module.get_history_generation()
+        monkeypatch.setattr(app_module, 'get_history_generation', lambda: generation + 1)
+        after_retention = client.get('/history', headers={'If-None-Match': etag})
+        assert after_retention.status_code == 200
+        assert after_retention.headers['ETag'] != etag
+
+    def test_rollups_unsupported_backend_returns_501(self, client, monkeypatch):
+        """Backends sem rollups são identificados pela flag supports_rollups."""
+        import database
+        assert client.get('/history/rollups').status_code == 200
+        monkeypatch.setattr(database.storage, 'supports_rollups', False)
+        assert client.get('/history/rollups').status_code == 501
+
+    def test_history_etag_survives_compression(self, client, patient):
+        """O ETag com sufixo de codificação (":br") continua validando o cache."""
+        for _ in range(5):
+            client.post('/predict', json=patient)
+        compressed = client.get('/history', headers={'Accept-Encoding': 'br'})
+        assert compressed.headers['Content-Encoding'] == 'br'
+
+        revalidated = client.get('/history', headers={
+            'Accept-Encoding': 'br', 'If-None-Match': compressed.headers['ETag']
+        })
+        assert revalidated.status_code == 304
+
+    def test_index_references_hashed_assets(self, client, app_module):
+        """O index aponta para CSS/JS versionados, que recebem cache de longa duração."""
+        hashes = app_module.STATIC_ASSET_HASHES
+        response = client.get('/')
+        html = response.get_data(as_text=True)
+        assert response.headers['Cache-Control'] == 'no-cache'
+        assert f'script.js?v={hashes["script.js"]}' in html
+        assert f'style.css?v={hashes["style.css"]}' in html
+
+        versioned = client.get(f'/script.js?v={hashes["script.js"]}')
+        assert 'immutable' in versioned.headers['Cache-Control']
+        versioned.close()
+
+        unversioned = client.get('/script.js')
+        assert unversioned.headers['Cache-Control'] == 'no-cache'
+        unversioned.close()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--tb=short"])
@@ -4,10 +4,8 @@ Implementa validação abrangente com métricas adequadas e thresholds de produ
 """
 
 import pytest
-import joblib
 import pandas as pd
 import numpy as np
-import os
 from sklearn.metrics import (
     accuracy_score, precision_score, recall_score, 
     f1_score, roc_auc_score, confusion_matrix
@@ -34,32 +32,25 @@ class TestModelPerformanceRequirements:
         'random_seed': 42
     }
     
+    @pytest.fixture(autouse=True, scope="class")
     @classmethod
-    def setup_class(cls):
-        """Setup inicial: carrega modelo e gera dados de teste."""
-        cls._load_model_artifacts()
-        cls._generate_test_data()
+    def _shared_artifacts(cls, model_pipeline, feature_columns, dataset_cache):
+        """Setup inicial: usa o modelo da sessão e os dados de teste do cache em disco."""
+        cls.model = model_pipeline
+        cls.feature_columns = feature_columns
+        cls.model_loaded = True
+        print(f"   Modelo: {type(cls.model).__name__} | Features: {len(cls.feature_columns)}")
+
+        cls.X_test, cls.y_test = dataset_cache(
+            cls.__name__, cls.TEST_CONFIG['random_seed'], cls.TEST_CONFIG['n_samples'],
+            cls._generate_test_data, cls.TEST_CONFIG
+        )
+        print(f"   Dados: {len(cls.y_test)} amostras | Classes: {np.bincount(cls.y_test)}")
         print("✅ Setup concluído - Modelo carregado para testes de performance")
     
-    @classmethod
-    def _load_model_artifacts(cls):
-        """Carrega modelo e features treinados."""
-        base_path = os.path.dirname(os.path.dirname(__file__))
-        model_path = os.path.join(base_path, 'trained_model', 'best_model_pipeline.joblib')
-        features_path = os.path.join(base_path, 'trained_model', 'feature_columns.joblib')
-        
-        try:
-            cls.model = joblib.load(model_path)
-            cls.feature_columns = joblib.load(features_path)
-            cls.model_loaded = True
-            print(f"   Modelo: {type(cls.model).__name__} | Features: {len(cls.feature_columns)}")
-        except Exception as e:
-            cls.model_loaded = False
-            pytest.fail(f"❌ Erro ao carregar modelo: {e}")
-    
     @classmethod
     def _generate_test_data(cls):
-        """Gera dados de teste sintéticos otimizados para performance."""
+        """Gera dados de teste sintéticos otimizados para performance; retorna (X_test, y_test)."""
         if not cls.model_loaded:
             pytest.fail("❌ Modelo não carregado")
         
@@ -84,10 +75,7 @@ class TestModelPerformanceRequirements:
                 test_data[feature] = cls._generate_default_feature_values(feature, n_samples)
         
         cls.X_test = pd.DataFrame(test_data)[cls.feature_columns]
-        
-        # Log de informações
-        class_counts = np.bincount(cls.y_test)
-        print(f"   Dados: {n_samples} amostras | Classes: {class_counts}")
+        return cls.X_test, cls.y_test
     
     @classmethod
     def _get_feature_configurations(cls):
@@ -0,0 +1,159 @@
+"""
+Testes do histórico SQLite particionado por mês: partições, rollups, retenção e migração.
+"""
+
+import pytest
+import sqlite3
+import gzip
+import json
+from datetime import datetime
+
+from database import SQLiteHistoryStorage
+from partitioned_history import PartitionedSQLiteHistoryStorage
+
+
+def _record(timestamp, mmse, prediction, probability):
+    return {"timestamp": timestamp, "input_data": {"MMSE": mmse}, "prediction": prediction, "probability": probability}
+
+
+@pytest.fixture
+def storage(tmp_path):
+    """Histórico particionado com registros em três meses."""
+    storage = PartitionedSQLiteHistoryStorage(str(tmp_path / "site.db"), retention_months=2)
+    storage.init()
+    storage.add_many([
+        _record("2025-05-10T08:15:00", 25, 0, 0.1),
+        _record("2025-06-01T09:00:00", 10, 1, 0.9),
+        _record("2025-06-01T09:30:00", 20, 0, 0.3),
+        _record("2025-06-02T14:00:00", 5, 1, 1.0),
+        _record("2025-07-05T10:00:00", 28, 0, 0.0),
+    ])
+    return storage
+
+
+def _tables(storage):
+    conn = sqlite3.connect(storage.database_file)
+    names = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    conn.close()
+    return names
+
+
+class TestPartitionedHistory:
+    """Valida particionamento mensal, rollups incrementais e retenção."""
+
+    def test_rows_are_split_into_monthly_partitions(self, storage):
+        """Cada mês tem sua tabela; ids seguem globais e a leitura atravessa partições."""
+        assert {'predictions_history_2025_05', 'predictions_history_2025_06',
+                'predictions_history_2025_07'} <= _tables(storage)
+
+        assert [r["id"] for r in storage.get_history(since_id=1, limit=3)] == [2, 3, 4]
+        assert [r["id"] for r in storage.get_history()] == [5, 4, 3, 2, 1]
+
+    def test_daily_and_hourly_rollups(self, storage):
+        """Rollups trazem contagem por classe, probabilidade média e quantis sem ler linhas brutas."""
+        daily = {r["bucket"]: r for r in storage.get_rollups('daily')}
+        june_first = daily["2025-06-01"]
+        assert june_first["count"] == 2
+        assert june_first["count_by_class"] == {"0": 1, "1": 1}
+        assert june_first["mean_probability"] == pytest.approx(0.6)
+        assert 10 <= june_first["quantiles"]["MMSE"]["p50"] <= 20.5
+
+        hourly = storage.get_rollups('hourly', start='2025-06-01', end='2025-06-01')
+        assert [r["bucket"] for r in hourly] == ["2025-06-01T09"]
+        assert hourly[0]["count"] == 2
+
+    def test_rollups_are_incremental(self, storage):
+        """Novas inserções somam aos buckets existentes."""
+        storage.add_many([_record("2025-06-01T23:59:00", 15, 1, 0.8)])
+        june_first = storage.get_rollups('daily', start='2025-06-01', end='2025-06-01')[0]
+        assert june_first["count"] == 3
+        assert june_first["count_by_class"] == {"0": 1, "1": 2}
+
+    def test_invalid_granularity(self, storage):
+        """Granularidade desconhecida gera ValueError."""
+        with pytest.raises(ValueError):
+            storage.get_rollups('weekly')
+
+    def test_retention_archives_and_drops_old_partitions(self, storage):
+        """Partições além da retenção vão para .jsonl.gz e saem do banco; rollups diários ficam."""
+        archived = storage.apply_retention(now=datetime(2025, 7, 20))
+        storage.compact()
+
+        assert len(archived) == 1 and archived[0].endswith("predictions_history_2025_05.jsonl.gz")
+        with gzip.open(archived[0], 'rt', encoding='utf-8') as archive:
+            assert [json.loads(line)["id"] for line in archive] == [1]
+
+        assert 'predictions_history_2025_05' not in _tables(storage)
+        assert [r["id"] for r in storage.get_history(since_id=0)] == [2, 3, 4, 5]
+        assert storage.get_latest_id() == 5
+        assert storage.get_generation() == 1
+        assert "2025-05-10" in {r["bucket"] for r in storage.get_rollups('daily')}
+        assert storage.get_rollups('hourly', start='2025-05-01', end='2025-05-31') == []
+
+    def test_retention_rewrites_archive_left_by_interrupted_run(self, storage):
+        """Arquivo deixado por uma execução interrompida antes do DROP é regravado, sem linhas duplicadas."""
+        storage.apply_retention(now=datetime(2025, 7, 20))
+        archive_path = storage.archive_dir + "/predictions_history_2025_06.jsonl.gz"
+        with gzip.open(archive_path, 'wt', encoding='utf-8') as archive:
+            archive.write(json.dumps({"id": 2}) + "\n")
+
+        archived = storage.apply_retention(now=datetime(2025, 8, 20))
+        assert archived == [archive_path]
+        with gzip.open(archive_path, 'rt', encoding='utf-8') as archive:
+            assert [json.loads(line)["id"] for line in archive] == [2, 3, 4]
+
+    def test_maintenance_compacts_only_after_archiving(self, tmp_path, monkeypatch):
+        """Sem partições arquivadas não há VACUUM (que bloquearia as escritas)."""
+        storage = PartitionedSQLiteHistoryStorage(str(tmp_path / "site.db"), retention_months=10_000)
+        storage.init()
+        storage.add_many([_record("2025-06-01T09:00:00", 10, 1, 0.9)])
+        compactions = []
+        monkeypatch.setattr(storage, 'compact', lambda: compactions.append(True))
+
+        assert storage.run_maintenance() == []
+        assert compactions == []
+
+        storage.retention_months = 1
+        assert len(storage.run_maintenance()) == 1
+        assert compactions == [True]
+
+    def test_since_id_is_ordered_across_overlapping_partitions(self, storage):
+        """Com faixas de id sobrepostas entre meses, since_id ainda pagina em ordem de id sem pular linhas."""
+        storage.add_many([_record("2025-06-30T23:59:59", 15, 0, 0.2), _record("2025-07-01T00:00:01", 16, 0, 0.2)])
+        storage.add_many([_record("2025-06-30T23:59:58", 17, 0, 0.2)])
+
+        ids = []
+        since_id = 0
+        while True:
+            page = storage.get_history(since_id=since_id, limit=2)
+            if not page:
+                break
+            ids += [r["id"] for r in page]
+            since_id = page[-1]["id"]
+        assert ids == [1, 2, 3, 4, 5, 6, 7, 8]
+
+    def test_timestamp_is_assigned_at_write_time(self, storage):
+        """Registros sem timestamp são carimbados na gravação, junto da reserva dos ids."""
+        storage.add_many([{"timestamp": None, "input_data": {"MMSE": 20}, "prediction": 0, "probability": 0.2}])
+        latest = storage.get_history(since_id=5)[0]
+        assert latest["id"] == 6
+        assert datetime.fromisoformat(latest["timestamp"]).date() == datetime.now().date()
+
+    def test_migrates_single_table_history(self, tmp_path):
+        """Um banco no formato antigo (tabela única) é migrado mantendo os ids."""
+        database_file = str(tmp_path / "legacy.db")
+        legacy = SQLiteHistoryStorage(database_file)
+        legacy.init()
+        legacy.add_many([_record("2025-06-01T09:00:00", 10, 1, 0.9), _record("2025-07-01T09:00:00", 20, 0, 0.2)])
+
+        storage = PartitionedSQLiteHistoryStorage(database_file)
+        storage.init()
+        storage.add_many([_record("2025-07-02T09:00:00", 25, 0, 0.1)])
+
+        assert 'predictions_history' not in _tables(storage)
+        assert [r["id"] for r in storage.get_history(since_id=0)] == [1, 2, 3]
+        assert sum(r["count"] for r in storage.get_rollups('daily')) == 3
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--tb=short"])
@@ -0,0 +1,81 @@
+"""
+Testes da pontuação em shadow de um modelo candidato (ShadowScorer).
+"""
+
+import pytest
+import pandas as pd
+
+from shadow import ShadowScorer
+
+
+class _FailingPipeline:
+    """Candidato que sempre falha, para validar o isolamento de erros."""
+
+    def predict(self, X):
+        raise RuntimeError("candidato quebrado")
+
+
+class TestShadowScorer:
+    """Valida concordância, deltas, latência e descarte sob carga."""
+
+    @pytest.fixture(autouse=True, scope="class")
+    @classmethod
+    def _shared_artifacts(cls, model_pipeline, feature_columns):
+        """Setup inicial: usa o pipeline de produção da sessão e monta um lote de pacientes."""
+        cls.model = model_pipeline
+        cls.feature_columns = feature_columns
+        rows = [{feature: 1 for feature in cls.feature_columns} for _ in range(3)]
+        rows[0]['MMSE'], rows[1]['MMSE'] = 28, 5
+        cls.X = pd.DataFrame(rows, columns=cls.feature_columns)
+        cls.predictions = cls.model.predict(cls.X)
+        cls.probabilities = cls.model.predict_proba(cls.X)[:, 1]
+
+    def test_identical_candidate_fully_agrees(self):
+        """O próprio modelo como candidato concorda 100% e tem delta zero."""
+        scorer = ShadowScorer(self.model)
+        assert scorer.submit(self.X, self.predictions, self.probabilities, primary_latency_ms=1.0)
+        scorer.shutdown()
+
+        stats = scorer.stats()
+        assert stats["scored"] == len(self.X)
+        assert stats["agreement_rate"] == 1.0
+        assert stats["max_abs_probability_delta"] == 0.0
+        assert stats["shadow_latency_ms"]["p50"] > 0
+        assert stats["recent"][0]["agree"] is True
+
+    def test_sheds_load_when_queue_is_full(self):
+        """Com a fila cheia, a taxa de amostragem vai a zero e nada é enfileirado."""
+        scorer = ShadowScorer(self.model, max_pending=2)
+        scorer.pending = 2
+        assert not scorer.submit(self.X, self.predictions, self.probabilities, primary_latency_ms=1.0)
+        assert scorer.stats()["skipped"] == 1
+        assert scorer.stats()["current_sample_rate"] == 0.0
+        scorer.shutdown()
+
+    def test_candidate_errors_are_isolated(self):
+        """Falhas do candidato são contadas e não propagam."""
+        scorer = ShadowScorer(_FailingPipeline())
+        scorer.submit(self.X, self.predictions, self.probabilities, primary_latency_ms=1.0)
+        scorer.shutdown()
+
+        stats = scorer.stats()
+        assert stats["errors"] == 1
+        assert stats["pending"] == 0
+        assert stats["scored"] == 0
+
+    def test_predict_submits_to_shadow(self, client, app_module, monkeypatch):
+        """O /predict enfileira o shadow e o /shadow expõe a comparação."""
+        scorer = ShadowScorer(self.model)
+        monkeypatch.setattr(app_module, 'shadow_scorer', scorer)
+        response = client.post('/predict', json=self.X.iloc[0].to_dict())
+        assert response.status_code == 200
+        scorer.shutdown()
+
+        stats = client.get('/shadow').get_json()
+        assert stats["enabled"] is True
+        assert stats["scored"] == 1
+        assert stats["recent"][0]["primary_prediction"] == response.get_json()["prediction"]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--tb=short"])
@@ -10,7 +10,12 @@ const CONFIG = {
     PESO_FUNCIONAL: 2,
     THRESHOLD_RISCO: 40,
     MAX_HISTORICO: 50,
-    PONTUACAO_MAXIMA: 27
+    PONTUACAO_MAXIMA: 27,
+    // Sincronização incremental e rolagem virtual do histórico
+    TAMANHO_PAGINA_HISTORICO: 500,
+    ALTURA_ITEM_HISTORICO: 280,
+    ALTURA_JANELA_HISTORICO: 600,
+    ITENS_EXTRAS_JANELA: 3
 };
 
 // Mapeamentos e traduções
@@ -35,6 +40,7 @@ const TRADUCOES = {
 class AlzheimerPredictor {
     constructor() {
         this.elementos = this.initializeElements();
+        this.historico = { registrosApi: [], locais: [], posicoesLocais: [], ultimoId: 0, fonte: null, stream: null, janela: null };
         this.setupEventListeners();
         this.carregarHistorico();
     }
@@ -265,6 +271,7 @@ class AlzheimerPredictor {
         const novoRegistro = {
             id: 'P' + String(historico.length + 1).padStart(4, '0'),
             data: agora.toLocaleString('pt-BR'),
+            ordem: agora.getTime(),
             diagnostico: diagnostico.resultado,
             porcentagem: diagnostico.porcentagem,
             resumo: this.gerarResumo(dados),
@@ -280,6 +287,7 @@ class AlzheimerPredictor {
         }
         
         localStorage.setItem('alzheimerHistorico', JSON.stringify(historico));
+        this.mesclarHistorico();
         return novoRegistro.id;
     }
 
@@ -319,10 +327,140 @@ class AlzheimerPredictor {
         this.elementos.result.style.display = 'block';
     }
 
-    carregarHistorico() {
-        const historico = JSON.parse(localStorage.getItem('alzheimerHistorico') || '[]');
-        
-        if (historico.length === 0) {
+    async carregarHistorico() {
+        try {
+            if (this.historico.fonte !== 'api') this.historico.ultimoId = 0;
+
+            // Busca apenas as predições novas (id > último id já exibido)
+            const novos = await this.buscarHistoricoIncremental();
+            if (this.historico.fonte !== 'api') {
+                this.historico.fonte = 'api';
+                this.historico.registrosApi = [];
+            }
+            this.adicionarRegistros(novos);
+            this.iniciarStreamHistorico();
+        } catch (err) {
+            // Backend indisponível: exibe apenas o histórico salvo localmente
+            console.warn('Histórico da API indisponível, usando localStorage:', err);
+            this.historico.fonte = 'local';
+            this.historico.registrosApi = [];
+            this.mesclarHistorico();
+        }
+    }
+
+    mesclarHistorico() {
+        // As análises feitas neste navegador ficam no localStorage (no máximo 50, mais recentes primeiro);
+        // as da API chegam por /history e SSE. O painel mostra as duas fontes juntas, mais recentes primeiro.
+        this.historico.locais = JSON.parse(localStorage.getItem('alzheimerHistorico') || '[]');
+        this.posicionarLocais();
+        this.renderizarHistorico();
+    }
+
+    posicionarLocais() {
+        // Em vez de reordenar tudo a cada evento, calcula só a posição de cada registro local
+        // na lista mesclada: locais mais recentes antes dele + registros da API mais recentes que ele
+        this.historico.posicoesLocais = this.historico.locais.map(
+            (local, i) => i + this.contarApiMaisRecentes(local.ordem || 0)
+        );
+    }
+
+    contarApiMaisRecentes(ordem) {
+        // registrosApi está em ordem crescente de id (e de data): busca binária
+        const api = this.historico.registrosApi;
+        let baixo = 0;
+        let alto = api.length;
+        while (baixo < alto) {
+            const meio = (baixo + alto) >> 1;
+            if ((api[meio].ordem || 0) > ordem) alto = meio;
+            else baixo = meio + 1;
+        }
+        return api.length - baixo;
+    }
+
+    totalHistorico() {
+        return this.historico.registrosApi.length + this.historico.locais.length;
+    }
+
+    registroHistorico(indice) {
+        // Registro na posição `indice` da lista mesclada (0 = mais recente)
+        const { posicoesLocais, locais, registrosApi } = this.historico;
+        let anteriores = 0;
+        while (anteriores < posicoesLocais.length && posicoesLocais[anteriores] <= indice) {
+            if (posicoesLocais[anteriores] === indice) return locais[anteriores];
+            anteriores++;
+        }
+        return registrosApi[registrosApi.length - 1 - (indice - anteriores)];
+    }
+
+    async buscarHistoricoIncremental() {
+        const novos = [];
+        let sinceId = this.historico.ultimoId;
+        while (true) {
+            const resposta = await fetch(`/history?since_id=${sinceId}&limit=${CONFIG.TAMANHO_PAGINA_HISTORICO}`);
+            if (!resposta.ok) throw new Error(`HTTP ${resposta.status}`);
+            const pagina = await resposta.json();
+            novos.push(...pagina);
+            if (pagina.length < CONFIG.TAMANHO_PAGINA_HISTORICO) return novos;
+            sinceId = pagina[pagina.length - 1].id;
+        }
+    }
+
+    iniciarStreamHistorico() {
+        if (this.historico.stream || !window.EventSource) return;
+
+        // Server-sent events: novas predições chegam sem precisar clicar em "Carregar"
+        const stream = new EventSource(`/history/stream?since_id=${this.historico.ultimoId}`);
+        stream.onmessage = (evento) => this.adicionarRegistros([JSON.parse(evento.data)]);
+        stream.onerror = () => {
+            // O navegador reconecta sozinho usando o Last-Event-ID
+            console.warn('Conexão do stream de histórico interrompida, reconectando...');
+        };
+        this.historico.stream = stream;
+    }
+
+    adicionarRegistros(registrosApi) {
+        const novos = registrosApi.filter(registro => registro.id > this.historico.ultimoId);
+        if (novos.length > 0) {
+            this.historico.ultimoId = novos[novos.length - 1].id;
+            // Ordem crescente de id; a renderização indexa de trás para frente (mais recentes primeiro).
+            // push um a um: espalhar a carga inicial como argumentos estoura a pilha com ~150 mil registros
+            for (const registro of novos) {
+                this.historico.registrosApi.push(this.converterRegistroApi(registro));
+            }
+        }
+        if (!this.historico.janela) {
+            this.mesclarHistorico();
+        } else if (novos.length > 0) {
+            this.posicionarLocais();
+            this.renderizarHistorico();
+        }
+    }
+
+    converterRegistroApi(registro) {
+        const dados = Object.fromEntries(
+            Object.entries(registro.input_data || {}).map(([campo, valor]) => [campo, valor == null ? '' : String(valor)])
+        );
+        const risco = registro.prediction === 1;
+        const data = new Date(registro.timestamp);
+
+        return {
+            // Prefixo distinto dos ids locais (P0001...) para não confundir as duas fontes
+            id: 'API-' + String(registro.id).padStart(4, '0'),
+            data: data.toLocaleString('pt-BR'),
+            ordem: data.getTime(),
+            diagnostico: risco ? 'Predisposição para Alzheimer: Sim - Risco Considerável' : 'Predisposição para Alzheimer: Não - Risco Baixo',
+            porcentagem: Math.round(registro.probability * 100),
+            resumo: this.gerarResumo(dados),
+            recomendacoes: this.gerarRecomendacoes({ porcentagem: risco ? 100 : 0 }),
+            medico: dados.DoctorInCharge || 'Não informado'
+        };
+    }
+
+    renderizarHistorico() {
+        const total = this.totalHistorico();
+
+        if (total === 0) {
+            this.historico.janela = null;
             this.elementos.historyList.innerHTML = `
                 <div style="text-align: center; padding: 20px; color: #666;">
                     <p>📝 Nenhum registro encontrado no histórico.</p>
@@ -332,36 +470,95 @@ class AlzheimerPredictor {
             return;
         }
 
-        this.elementos.historyList.innerHTML = `
-            <div style="margin: 20px 0;">
-                <h3>📋 Últimos ${historico.length} Registros</h3>
-                ${historico.map(registro => `
-                    <div style="border: 1px solid #ddd; border-radius: 8px; padding: 15px; margin: 10px 0; background: white;">
-                        <div style="display: flex; justify-content: space-between; align-items: center; margin-bottom: 10px;">
-                            <h4 style="margin: 0; color: #333;">👤 ${registro.id}</h4>
-                            <span style="font-size: 0.9em; color: #666;">📅 ${registro.data}</span>
-                        </div>
-                        
-                        <div style="margin: 10px 0;">
-                            <strong>🏥 Diagnóstico:</strong> ${registro.diagnostico} (${registro.porcentagem}%)
-                        </div>
-                        
-                        <div style="margin: 10px 0;">
-                            <strong>📊 Resumo:</strong> ${registro.resumo}
-                        </div>
-                        
-                        <div style="margin: 10px 0;">
-                            <strong>👨‍⚕️ Médico:</strong> ${registro.medico}
-                        </div>
-                        
-                        <div style="background: #f8f9fa; padding: 10px; border-radius: 5px; margin-top: 10px;">
-                            <strong>💡 Recomendações:</strong>
-                            <ul style="margin: 5px 0; padding-left: 20px;">
-                                ${registro.recomendacoes.map(rec => `<li>${rec}</li>`).join('')}
-                            </ul>
-                        </div>
+        // Estrutura da lista virtual é criada uma única vez; depois só a janela visível é redesenhada
+        if (!this.historico.janela) {
+            this.elementos.historyList.innerHTML = `
+                <div style="margin: 20px 0;">
+                    <h3 class="history-count"></h3>
+                    <div class="history-viewport" style="height: ${CONFIG.ALTURA_JANELA_HISTORICO}px;">
+                        <div class="history-spacer"></div>
                     </div>
-                `).join('')}
+                </div>
+            `;
+            const viewport = this.elementos.historyList.querySelector('.history-viewport');
+            this.historico.janela = {
+                titulo: this.elementos.historyList.querySelector('.history-count'),
+                viewport,
+                spacer: viewport.querySelector('.history-spacer'),
+                agendado: false
+            };
+            viewport.addEventListener('scroll', () => this.agendarRenderizacaoJanela());
+        }
+
+        const janela = this.historico.janela;
+        janela.titulo.textContent = `📋 Últimos ${total} Registros`;
+        janela.spacer.style.height = `${total * CONFIG.ALTURA_ITEM_HISTORICO}px`;
+        this.renderizarJanela();
+    }
+
+    agendarRenderizacaoJanela() {
+        const janela = this.historico.janela;
+        if (janela.agendado) return;
+        janela.agendado = true;
+        requestAnimationFrame(() => {
+            janela.agendado = false;
+            this.renderizarJanela();
+        });
+    }
+
+    renderizarJanela() {
+        const { viewport, spacer } = this.historico.janela;
+        const altura = CONFIG.ALTURA_ITEM_HISTORICO;
+
+        // Desenha só os itens visíveis (mais uma pequena margem), mantendo o DOM constante
+        const inicio = Math.max(0, Math.floor(viewport.scrollTop / altura) - CONFIG.ITENS_EXTRAS_JANELA);
+        const visiveis = Math.ceil(CONFIG.ALTURA_JANELA_HISTORICO / altura) + 2 * CONFIG.ITENS_EXTRAS_JANELA;
+        const fim = Math.min(this.totalHistorico(), inicio + visiveis);
+
+        const itens = [];
+        for (let indice = inicio; indice < fim; indice++) {
+            itens.push(this.renderizarItemHistorico(this.registroHistorico(indice), indice * altura));
+        }
+        spacer.innerHTML = itens.join('');
+    }
+
+    escaparHtml(valor) {
+        // Registros da API vêm de qualquer cliente (ex.: DoctorInCharge): nunca interpolar sem escapar
+        return String(valor ?? '')
+            .replace(/&/g, '&amp;')
+            .replace(/</g, '&lt;')
+            .replace(/>/g, '&gt;')
+            .replace(/"/g, '&quot;')
+            .replace(/'/g, '&#39;');
+    }
+
+    renderizarItemHistorico(registro, topo) {
+        const esc = (valor) => this.escaparHtml(valor);
+        return `
+            <div class="history-virtual-item" style="top: ${topo}px; height: ${CONFIG.ALTURA_ITEM_HISTORICO - 10}px;">
+                <div style="display: flex; justify-content: space-between; align-items: center; margin-bottom: 10px;">
+                    <h4 style="margin: 0; color: #333;">👤 ${esc(registro.id)}</h4>
+                    <span style="font-size: 0.9em; color: #666;">📅 ${esc(registro.data)}</span>
+                </div>
+                
+                <div style="margin: 10px 0;">
+                    <strong>🏥 Diagnóstico:</strong> ${esc(registro.diagnostico)} (${esc(registro.porcentagem)}%)
+                </div>
+                
+                <div style="margin: 10px 0;">
+                    <strong>📊 Resumo:</strong> ${esc(registro.resumo)}
+                </div>
+                
+                <div style="margin: 10px 0;">
+                    <strong>👨‍⚕️ Médico:</strong> ${esc(registro.medico)}
+                </div>
+                
+                <div style="background: #f8f9fa; padding: 10px; border-radius: 5px; margin-top: 10px;">
+                    <strong>💡 Recomendações:</strong>
+                    <ul style="margin: 5px 0; padding-left: 20px;">
+                        ${(registro.recomendacoes || []).map(rec => `<li>${esc(rec)}</li>`).join('')}
+                    </ul>
+                </div>
             </div>
         `;
     }